@@ -0,0 +1,108 @@
+"""
+Batching - Coalesces concurrent requests into batched calls
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """
+    Collects items submitted by concurrent callers and dispatches them in batches
+
+    A batch is flushed when it reaches max_batch_size or when max_wait_ms has
+    elapsed since its first item arrived, whichever comes first. The batch
+    function receives the list of items and must return one result per item,
+    in order; results that are exceptions are raised in the matching caller.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 50
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            batch_fn: Coroutine function processing a list of items
+            max_batch_size: Maximum number of items per batch
+            max_wait_ms: Maximum time to hold a partial batch open
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit an item and wait for its result
+
+        Args:
+            item: Item to include in the next batch
+
+        Returns:
+            Result produced by the batch function for this item
+        """
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Group queued items into batches and hand them to dispatch tasks"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without blocking collection of the next batch
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run the batch function and resolve each caller's future"""
+        logger.debug(f"Dispatching batch of {len(batch)} items")
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Stop collecting new batches; in-flight dispatches are left to finish"""
+        if self._collector and not self._collector.done():
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+        self._collector = None
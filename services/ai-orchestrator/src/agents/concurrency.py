@@ -0,0 +1,71 @@
+"""
+Concurrency - Adaptive limits on in-flight calls to rate-limited backends
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Async context manager bounding the number of in-flight calls
+
+    The bound follows AIMD: when a call fails with one of the rate-limit
+    errors the limit is halved and held for a cooldown period; after that,
+    each successful call raises it by one until max_inflight is reached
+    again. Only the first rate-limit error in a cooldown window halves the
+    limit, so a burst of 429s from calls already in flight counts once.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = 16,
+        min_inflight: int = 1,
+        cooldown_s: float = 30.0,
+        rate_limit_errors: Tuple[Type[BaseException], ...] = ()
+    ):
+        """
+        Initialize limiter
+
+        Args:
+            max_inflight: Upper bound on concurrent calls
+            min_inflight: Lower bound the limit never drops below
+            cooldown_s: Time after a decrease before the limit may grow again
+            rate_limit_errors: Exception types signalling backend overload
+        """
+        self.max_inflight = max(1, max_inflight)
+        self.min_inflight = max(1, min(min_inflight, self.max_inflight))
+        self.cooldown = cooldown_s
+        self.rate_limit_errors = rate_limit_errors
+        self.limit = self.max_inflight
+        self._inflight = 0
+        self._cooldown_until = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def __aenter__(self) -> "AdaptiveConcurrencyLimiter":
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._inflight < self.limit)
+            self._inflight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        async with self._condition:
+            self._inflight -= 1
+            now = time.monotonic()
+
+            if exc_type is not None and issubclass(exc_type, self.rate_limit_errors):
+                if now >= self._cooldown_until:
+                    self.limit = max(self.min_inflight, self.limit // 2)
+                    logger.warning(f"Rate limited, reducing concurrency limit to {self.limit}")
+                self._cooldown_until = now + self.cooldown
+            elif exc_type is None and self.limit < self.max_inflight and now >= self._cooldown_until:
+                self.limit += 1
+
+            self._condition.notify_all()
+        return False
@@ -1,16 +1,80 @@
 """
 Workflow Orchestrator - LangGraph-based agentic workflow
 """
-import json
+import asyncio
+import hashlib
 import logging
-from typing import TypedDict, Dict, List, Any, Optional
+from datetime import datetime
+from functools import partial
+from typing import TypedDict, Dict, List, Any, Optional, AsyncIterator, Tuple
 from langgraph.graph import StateGraph, END
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+from openai import RateLimitError
+import httpx
 import os
+import random
 import networkx as nx
+import orjson
+
+from .batching import BatchScheduler
+from .cache import LRUCache
+from .concurrency import AdaptiveConcurrencyLimiter
+from .reachability import PARALLEL_BFS_MIN_SEEDS, CSRAdjacency, reachable_mask
 
 logger = logging.getLogger(__name__)
 
+_now = datetime.utcnow
+
+# Fixed instruction blocks, sent as a shared system message so only the
+# compact per-request payload varies between calls
+QUERY_PLAN_INSTRUCTIONS = """Analyze the code change described by the user and identify what needs to be analyzed.
+
+Provide a JSON response with:
+1. key_areas: List of code areas affected
+2. analysis_priorities: Priority levels (HIGH/MEDIUM/LOW)
+3. testing_requirements: What needs to be tested
+4. risks: Identified risks"""
+
+IMPACT_SCORE_INSTRUCTIONS = """Score the impact of a code change from the JSON analysis summary provided by the user
+(affected_count: affected components, ctx_docs: retrieved context documents).
+
+Provide impact scores (0-1) for:
+1. criticality_score: How critical are the affected components?
+2. risk_score: What's the risk level of this change?
+3. testing_scope: What % of tests need to be run?
+
+Response format: JSON with numeric scores only"""
+
+TEST_PLAN_INSTRUCTIONS = """Generate a test plan for the code change in the JSON summary provided by the user
+(affected_count: affected components, change: change description).
+
+Provide test recommendations:
+1. unit_tests: List of unit tests to run
+2. integration_tests: Integration tests needed
+3. smoke_tests: Critical smoke tests
+4. priority: Test execution priority
+
+Response format: JSON"""
+
+
+def serialize_impact_analysis(impact_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert dependency analysis results to a JSON-serializable dict
+    
+    Args:
+        impact_analysis: Dependency analysis results from the workflow state
+        
+    Returns:
+        Copy with affected components as a sorted list
+    """
+    if 'affected_components' not in impact_analysis:
+        return impact_analysis
+    return {
+        **impact_analysis,
+        "affected_components": sorted(impact_analysis['affected_components'], key=str)
+    }
+
 
 class WorkflowState(TypedDict):
     """State passed through the workflow"""
@@ -39,12 +103,138 @@ class WorkflowOrchestrator:
             rag_pipeline: RAG pipeline instance for context retrieval
         """
         self.rag_pipeline = rag_pipeline
+        # One pooled HTTP/2 client keeps OpenAI connections warm across calls
+        self._http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=float(os.getenv("OPENAI_HTTP_TIMEOUT_S", "60")),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "50"))
+            )
+        )
         self.llm = ChatOpenAI(
             model=os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview"),
             temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.2")),
-            api_key=os.getenv("OPENAI_API_KEY")
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_async_client=self._http_client
         )
         self.compiled_workflow = None
+        # Scoring answers with a small JSON document
+        short_llm = self.llm.bind(max_tokens=int(os.getenv("OPENAI_SHORT_MAX_TOKENS", "200")))
+        # Test plans list many tests, so they get a larger budget and JSON mode
+        test_plan_llm = self.llm.bind(
+            max_tokens=int(os.getenv("OPENAI_TEST_PLAN_MAX_TOKENS", "1024")),
+            response_format={"type": "json_object"}
+        )
+        
+        # One batcher per prompt type coalesces concurrent requests into llm.abatch calls
+        self._llm_batchers = {
+            prompt_type: BatchScheduler(
+                partial(self._batch_llm, llm),
+                max_batch_size=int(os.getenv("LLM_BATCH_MAX_SIZE", "16")),
+                max_wait_ms=float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "50"))
+            )
+            for prompt_type, llm in (
+                ("query_plan", self.llm),
+                ("impact_score", short_llm),
+                ("test_plan", test_plan_llm)
+            )
+        }
+        # Bounds in-flight LLM calls, backing off when OpenAI rate limits
+        self._llm_limiter = AdaptiveConcurrencyLimiter(
+            max_inflight=int(os.getenv("LLM_MAX_INFLIGHT", "16")),
+            cooldown_s=float(os.getenv("LLM_RATE_LIMIT_COOLDOWN_S", "30")),
+            rate_limit_errors=(RateLimitError,)
+        )
+        self._llm_rate_limit_retries = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+        # Prompt templates compiled once; each node only fills in its payload
+        self._query_plan_template = self._build_template(QUERY_PLAN_INSTRUCTIONS)
+        self._impact_score_template = self._build_template(IMPACT_SCORE_INSTRUCTIONS)
+        self._test_plan_template = self._build_template(TEST_PLAN_INSTRUCTIONS)
+        # LLM responses keyed by a hash of prompt type and prompt messages
+        self._llm_cache = LRUCache(maxsize=int(os.getenv("LLM_CACHE_SIZE", "1024")))
+        # CSR adjacency of dependency graphs keyed by a hash of their node-link payload
+        self._graph_cache = LRUCache(maxsize=int(os.getenv("GRAPH_CACHE_SIZE", "32")))
+        # From this many affected files on, BFS runs in per-thread seed chunks
+        self._parallel_bfs_min_seeds = int(os.getenv("PARALLEL_BFS_MIN_SEEDS", str(PARALLEL_BFS_MIN_SEEDS)))
+        # Changes shorter than this touching at most this many files skip the LLM stages
+        self._trivial_max_chars = int(os.getenv("TRIVIAL_CHANGE_MAX_CHARS", "200"))
+        self._trivial_max_files = int(os.getenv("TRIVIAL_CHANGE_MAX_FILES", "1"))
+    
+    @staticmethod
+    def _build_template(instructions: str) -> ChatPromptTemplate:
+        """Build a chat template with fixed instructions and a per-request payload"""
+        return ChatPromptTemplate.from_messages([
+            ("system", instructions),
+            ("human", "{payload}")
+        ])
+    
+    async def _batch_llm(self, llm, prompts: List[Any]) -> List[Any]:
+        """Invoke the LLM on a batch of prompts, returning per-prompt exceptions"""
+        return await asyncio.gather(
+            *(self._limited_invoke(llm, prompt) for prompt in prompts),
+            return_exceptions=True
+        )
+    
+    async def _limited_invoke(self, llm, prompt: List[Any]) -> Any:
+        """
+        Invoke the LLM within the concurrency limit, retrying rate-limited calls
+        
+        Args:
+            llm: Chat model (or bound runnable) to invoke
+            prompt: Prompt messages to send
+            
+        Returns:
+            LLM response message
+        """
+        for attempt in range(self._llm_rate_limit_retries + 1):
+            try:
+                async with self._llm_limiter:
+                    return await llm.ainvoke(prompt)
+            except RateLimitError:
+                if attempt == self._llm_rate_limit_retries:
+                    raise
+                # Jitter so retried calls don't restart in lockstep
+                await asyncio.sleep(random.uniform(0, 0.25))
+    
+    async def _invoke_llm(self, prompt_type: str, prompt: List[Any]) -> Any:
+        """
+        Invoke the LLM through the batcher for the given prompt type
+        
+        Identical prompts are answered from an in-process response cache.
+        Responses cut off at max_tokens are not cached.
+        
+        Args:
+            prompt_type: Key of the batcher to submit to
+            prompt: Prompt messages to send
+            
+        Returns:
+            LLM response message
+            
+        Raises:
+            ValueError: If the response was truncated at max_tokens
+        """
+        key = hashlib.blake2b(
+            orjson.dumps([prompt_type] + [[message.type, message.content] for message in prompt]),
+            digest_size=16
+        ).hexdigest()
+        
+        response = self._llm_cache.get(key)
+        if response is None:
+            response = await self._llm_batchers[prompt_type].submit(prompt)
+            # A truncated JSON answer is unusable, so don't parse or cache it
+            if getattr(response, 'response_metadata', {}).get('finish_reason') == 'length':
+                raise ValueError(f"LLM {prompt_type} response truncated at max_tokens")
+            response = self._llm_cache.put(key, response)
+        else:
+            logger.debug(f"LLM cache hit for {prompt_type} prompt")
+        return response
+    
+    async def close(self):
+        """Release background resources"""
+        for batcher in self._llm_batchers.values():
+            await batcher.close()
+        await self._http_client.aclose()
     
     def build_workflow(self):
         """
@@ -57,28 +247,24 @@ class WorkflowOrchestrator:
             workflow = StateGraph(WorkflowState)
             
             # Define nodes
-            workflow.add_node("query_planner", self.plan_queries)
-            workflow.add_node("dependency_analyzer", self.analyze_dependencies)
-            workflow.add_node("rag_retriever", self.retrieve_context)
-            workflow.add_node("impact_scorer", self.score_impact)
-            workflow.add_node("test_planner", self.plan_tests)
+            workflow.add_node("context_gatherer", self.gather_context)
+            workflow.add_node("impact_assessor", self.assess_impact)
+            workflow.add_node("fast_path", self.assess_trivial_change)
             workflow.add_node("report_generator", self.generate_report)
             
-            # Set entry point
-            workflow.set_entry_point("query_planner")
+            # Set entry point; trivially small changes take the fast path
+            workflow.set_conditional_entry_point(
+                self.route_change,
+                {"fast_path": "fast_path", "context_gatherer": "context_gatherer"}
+            )
             
             # Define edges
-            # From query_planner, split to dependency_analyzer and rag_retriever (parallel)
-            workflow.add_edge("query_planner", "dependency_analyzer")
-            workflow.add_edge("query_planner", "rag_retriever")
-            
-            # Both converge at impact_scorer
-            workflow.add_edge("dependency_analyzer", "impact_scorer")
-            workflow.add_edge("rag_retriever", "impact_scorer")
-            
-            # Sequential path after impact_scorer
-            workflow.add_edge("impact_scorer", "test_planner")
-            workflow.add_edge("test_planner", "report_generator")
+            # context_gatherer runs query planning, dependency analysis and
+            # RAG retrieval concurrently; impact_assessor then issues the
+            # scoring and test planning prompts concurrently
+            workflow.add_edge("context_gatherer", "impact_assessor")
+            workflow.add_edge("impact_assessor", "report_generator")
+            workflow.add_edge("fast_path", "report_generator")
             
             # End after report generation
             workflow.add_edge("report_generator", END)
@@ -93,7 +279,47 @@ class WorkflowOrchestrator:
             logger.error(f"Error building workflow: {str(e)}")
             raise
     
-    def plan_queries(self, state: WorkflowState) -> WorkflowState:
+    def route_change(self, state: WorkflowState) -> str:
+        """
+        Router - Send trivially small changes down the fast path
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            Name of the first node to run
+        """
+        if (len(state['change_description']) < self._trivial_max_chars
+                and len(state.get('affected_files', [])) <= self._trivial_max_files):
+            logger.info("Trivial change, skipping LLM stages")
+            return "fast_path"
+        return "context_gatherer"
+    
+    async def assess_trivial_change(self, state: WorkflowState) -> Dict[str, Any]:
+        """
+        Fast Path - Analyze dependencies and assign default low-risk scores
+        without query planning, retrieval or LLM scoring
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            State keys written by this node
+        """
+        updates = await self.analyze_dependencies(state)
+        affected_count = updates.get('impact_analysis', {}).get('impact_count', 0)
+        
+        updates['criticality_scores'] = {'criticality': 0.1, 'risk': 0.1, 'testing_scope': 0.1}
+        updates['test_plan'] = {
+            "unit_tests": [f"test_affected_component_{i}" for i in range(min(5, affected_count))],
+            "integration_tests": [],
+            "smoke_tests": ["smoke_test_critical_paths"],
+            "priority": "LOW"
+        }
+        updates['workflow_metadata'] = {**state.get('workflow_metadata', {}), "fast_path": True}
+        return updates
+    
+    async def plan_queries(self, state: WorkflowState) -> Dict[str, Any]:
         """
         Query Planner - Parse and plan the analysis
         
@@ -101,42 +327,100 @@ class WorkflowOrchestrator:
             state: Current workflow state
             
         Returns:
-            Updated state
+            State keys written by this node
         """
         try:
-            logger.info(f"Planning queries for: {state['change_description'][:100]}")
+            change_description = state['change_description']
+            logger.info(f"Planning queries for: {change_description[:100]}")
             
-            prompt = f"""Analyze this code change and identify what needs to be analyzed:
-
-Change: {state['change_description']}
-
-Provide a JSON response with:
-1. key_areas: List of code areas affected
-2. analysis_priorities: Priority levels (HIGH/MEDIUM/LOW)
-3. testing_requirements: What needs to be tested
-4. risks: Identified risks"""
+            prompt = self._query_plan_template.format_messages(payload=change_description)
             
-            response = self.llm.invoke(prompt)
+            response = await self._invoke_llm("query_plan", prompt)
             
             try:
-                plan = json.loads(response.content if hasattr(response, 'content') else str(response))
-            except json.JSONDecodeError:
+                plan = orjson.loads(response.content if hasattr(response, 'content') else str(response))
+            except orjson.JSONDecodeError:
                 plan = {"raw_response": response.content if hasattr(response, 'content') else str(response)}
             
-            state['workflow_metadata'] = {
-                **state.get('workflow_metadata', {}),
-                "query_plan": plan
-            }
-            
             logger.info("Query planning completed")
-            return state
+            return {
+                'workflow_metadata': {
+                    **state.get('workflow_metadata', {}),
+                    "query_plan": plan
+                }
+            }
             
         except Exception as e:
             logger.error(f"Error in query planner: {str(e)}")
-            state['error'] = f"Query planning failed: {str(e)}"
-            return state
+            return {'error': f"Query planning failed: {str(e)}"}
     
-    def analyze_dependencies(self, state: WorkflowState) -> WorkflowState:
+    async def _run_concurrently(self, state: WorkflowState, stage: str, *steps) -> Dict[str, Any]:
+        """
+        Run independent node steps concurrently and merge their updates
+        
+        Each step reads the shared state and returns only the keys it writes;
+        the steps write disjoint keys, so the updates merge without conflicts.
+        
+        Args:
+            state: Current workflow state
+            stage: Stage name used in error messages
+            steps: Node coroutine functions to run
+            
+        Returns:
+            Merged state keys written by the steps
+        """
+        results = await asyncio.gather(
+            *(step(state) for step in steps),
+            return_exceptions=True
+        )
+        
+        updates: Dict[str, Any] = {}
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error in {stage}: {str(result)}")
+                updates['error'] = f"{stage} failed: {str(result)}"
+            else:
+                updates.update(result)
+        
+        return updates
+    
+    async def gather_context(self, state: WorkflowState) -> Dict[str, Any]:
+        """
+        Context Gatherer - Plan queries, analyze dependencies and retrieve
+        context concurrently
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            State keys written by this node
+        """
+        return await self._run_concurrently(
+            state,
+            "Context gathering",
+            self.plan_queries,
+            self.analyze_dependencies,
+            self.retrieve_context
+        )
+    
+    async def assess_impact(self, state: WorkflowState) -> Dict[str, Any]:
+        """
+        Impact Assessor - Score impact and plan tests concurrently
+        
+        Args:
+            state: Current workflow state
+            
+        Returns:
+            State keys written by this node
+        """
+        return await self._run_concurrently(
+            state,
+            "Impact assessment",
+            self.score_impact,
+            self.plan_tests
+        )
+    
+    async def analyze_dependencies(self, state: WorkflowState) -> Dict[str, Any]:
         """
         Dependency Analyzer - Analyze graph structure
         
@@ -144,42 +428,68 @@ Provide a JSON response with:
             state: Current workflow state
             
         Returns:
-            Updated state
+            State keys written by this node
         """
         try:
             logger.info("Analyzing dependencies...")
             
+            affected_files = state.get('affected_files', [])
+            dependency_graph = state.get('dependency_graph')
+            
+            # Affected components stay a frozenset until the report is serialized
+            affected = frozenset(affected_files)
+            
             # If dependency_graph is provided, analyze it
+            if dependency_graph:
+                # Reconstruct graph (cached per payload) and find affected nodes
+                adjacency = self._get_adjacency(dependency_graph)
+                seeds = adjacency.seeds(affected_files)
+                
+                # Descendants and ancestors of all seeds, one traversal per direction
+                mask = reachable_mask(
+                    adjacency.succ_indptr, adjacency.succ_indices, seeds, self._parallel_bfs_min_seeds
+                )
+                mask |= reachable_mask(
+                    adjacency.pred_indptr, adjacency.pred_indices, seeds, self._parallel_bfs_min_seeds
+                )
+                affected = frozenset(adjacency.to_names(mask))
+            
             impact_analysis = {
-                "affected_components": state.get('affected_files', []),
+                "affected_components": affected,
+                "impact_count": len(affected),
                 "analysis_type": "dependency_graph",
-                "timestamp": __import__('datetime').datetime.utcnow().isoformat()
+                "timestamp": _now().isoformat()
             }
             
-            if state.get('dependency_graph'):
-                # Reconstruct graph and find affected nodes
-                graph = nx.node_link_graph(state['dependency_graph'])
-                
-                affected = set()
-                for file in state.get('affected_files', []):
-                    if file in graph:
-                        # Get descendants and ancestors
-                        affected.update(nx.descendants(graph, file))
-                        affected.update(nx.ancestors(graph, file))
-                
-                impact_analysis['affected_components'] = list(affected)
-                impact_analysis['impact_count'] = len(affected)
-            
-            state['impact_analysis'] = impact_analysis
-            logger.info(f"Found {len(state['impact_analysis'].get('affected_components', []))} affected components")
-            return state
+            logger.info(f"Found {impact_analysis['impact_count']} affected components")
+            return {'impact_analysis': impact_analysis}
             
         except Exception as e:
             logger.error(f"Error in dependency analyzer: {str(e)}")
-            state['error'] = f"Dependency analysis failed: {str(e)}"
-            return state
+            return {'error': f"Dependency analysis failed: {str(e)}"}
     
-    def retrieve_context(self, state: WorkflowState) -> WorkflowState:
+    def _get_adjacency(self, graph_data: Dict[str, Any]) -> CSRAdjacency:
+        """
+        Reconstruct a dependency graph as CSR arrays, reusing them across
+        identical payloads
+        
+        Args:
+            graph_data: Dependency graph in node-link format
+            
+        Returns:
+            CSR adjacency (shared between requests, must not be mutated)
+        """
+        key = hashlib.blake2b(
+            orjson.dumps(graph_data, option=orjson.OPT_SORT_KEYS, default=str),
+            digest_size=16
+        ).hexdigest()
+        
+        adjacency = self._graph_cache.get(key)
+        if adjacency is None:
+            adjacency = self._graph_cache.put(key, CSRAdjacency(nx.node_link_graph(graph_data)))
+        return adjacency
+    
+    async def retrieve_context(self, state: WorkflowState) -> Dict[str, Any]:
         """
         RAG Retriever - Retrieve relevant code context
         
@@ -187,30 +497,27 @@ Provide a JSON response with:
             state: Current workflow state
             
         Returns:
-            Updated state
+            State keys written by this node
         """
         try:
             logger.info("Retrieving context...")
             
             if not self.rag_pipeline:
                 logger.warning("RAG pipeline not available, skipping context retrieval")
-                state['retrieved_context'] = []
-                return state
+                return {'retrieved_context': []}
             
-            # Retrieve context based on change description and affected files
-            query = f"{state['change_description']} {' '.join(state.get('affected_files', [])[:5])}"
-            context = self.rag_pipeline.retrieve_context(query, k=10)
+            # One query per signal (change description, affected files), sent as a batch
+            queries = [state['change_description']] + state.get('affected_files', [])[:5]
+            context = await self.rag_pipeline.aretrieve_context_batch(queries, k=10)
             
-            state['retrieved_context'] = context
             logger.info(f"Retrieved {len(context)} context documents")
-            return state
+            return {'retrieved_context': context}
             
         except Exception as e:
             logger.error(f"Error in RAG retriever: {str(e)}")
-            state['retrieved_context'] = []
-            return state
+            return {'retrieved_context': []}
     
-    def score_impact(self, state: WorkflowState) -> WorkflowState:
+    async def score_impact(self, state: WorkflowState) -> Dict[str, Any]:
         """
         Impact Scorer - Score criticality and risk
         
@@ -218,53 +525,44 @@ Provide a JSON response with:
             state: Current workflow state
             
         Returns:
-            Updated state
+            State keys written by this node
         """
         try:
             logger.info("Scoring impact...")
             
-            # Prepare scoring prompt
-            affected_components = state.get('impact_analysis', {}).get('affected_components', [])
-            context_summary = f"Retrieved {len(state.get('retrieved_context', []))} context documents"
+            # Prepare scoring prompt from numeric summaries only
+            summary = {
+                "affected_count": state.get('impact_analysis', {}).get('impact_count', 0),
+                "ctx_docs": len(state.get('retrieved_context', []))
+            }
             
-            prompt = f"""Based on the analysis, score the impact of this change:
-
-Affected Components: {len(affected_components)}
-Context Summary: {context_summary}
-
-Provide impact scores (0-1) for:
-1. criticality_score: How critical are the affected components?
-2. risk_score: What's the risk level of this change?
-3. testing_scope: What % of tests need to be run?
-
-Response format: JSON with numeric scores"""
+            prompt = self._impact_score_template.format_messages(payload=orjson.dumps(summary).decode())
             
-            response = self.llm.invoke(prompt)
+            response = await self._invoke_llm("impact_score", prompt)
             
             try:
-                scores = json.loads(response.content if hasattr(response, 'content') else str(response))
+                scores = orjson.loads(response.content if hasattr(response, 'content') else str(response))
                 # Ensure numeric values
-                state['criticality_scores'] = {
+                criticality_scores = {
                     'criticality': float(scores.get('criticality_score', 0.5)),
                     'risk': float(scores.get('risk_score', 0.5)),
                     'testing_scope': float(scores.get('testing_scope', 0.5))
                 }
-            except (json.JSONDecodeError, ValueError):
-                state['criticality_scores'] = {
+            except (orjson.JSONDecodeError, ValueError):
+                criticality_scores = {
                     'criticality': 0.5,
                     'risk': 0.5,
                     'testing_scope': 0.5
                 }
             
-            logger.info(f"Impact scored: {state['criticality_scores']}")
-            return state
+            logger.info(f"Impact scored: {criticality_scores}")
+            return {'criticality_scores': criticality_scores}
             
         except Exception as e:
             logger.error(f"Error in impact scorer: {str(e)}")
-            state['criticality_scores'] = {'criticality': 0.5, 'risk': 0.5, 'testing_scope': 0.5}
-            return state
+            return {'criticality_scores': {'criticality': 0.5, 'risk': 0.5, 'testing_scope': 0.5}}
     
-    def plan_tests(self, state: WorkflowState) -> WorkflowState:
+    async def plan_tests(self, state: WorkflowState) -> Dict[str, Any]:
         """
         Test Planner - Generate test recommendations
         
@@ -272,49 +570,41 @@ Response format: JSON with numeric scores"""
             state: Current workflow state
             
         Returns:
-            Updated state
+            State keys written by this node
         """
         try:
             logger.info("Planning tests...")
             
-            affected_count = len(state.get('impact_analysis', {}).get('affected_components', []))
-            criticality = state.get('criticality_scores', {}).get('criticality', 0.5)
+            # Runs concurrently with score_impact, so only dependency analysis
+            # results are available here
+            affected_count = state.get('impact_analysis', {}).get('impact_count', 0)
             
-            prompt = f"""Generate a test plan for this code change:
-
-Affected Components: {affected_count}
-Criticality Score: {criticality}
-Change: {state['change_description'][:500]}
-
-Provide test recommendations:
-1. unit_tests: List of unit tests to run
-2. integration_tests: Integration tests needed
-3. smoke_tests: Critical smoke tests
-4. priority: Test execution priority
-
-Response format: JSON"""
+            summary = {
+                "affected_count": affected_count,
+                "change": state['change_description'][:int(os.getenv("TEST_PLAN_CHANGE_CHARS", "200"))]
+            }
             
-            response = self.llm.invoke(prompt)
+            prompt = self._test_plan_template.format_messages(payload=orjson.dumps(summary).decode())
+            
+            response = await self._invoke_llm("test_plan", prompt)
             
             try:
-                test_plan = json.loads(response.content if hasattr(response, 'content') else str(response))
-            except json.JSONDecodeError:
+                test_plan = orjson.loads(response.content if hasattr(response, 'content') else str(response))
+            except orjson.JSONDecodeError:
                 test_plan = {
                     "unit_tests": [f"test_affected_component_{i}" for i in range(min(5, affected_count))],
                     "integration_tests": ["integration_test_main_flow"],
                     "smoke_tests": ["smoke_test_critical_paths"]
                 }
             
-            state['test_plan'] = test_plan
             logger.info(f"Test plan generated with {len(test_plan.get('unit_tests', []))} unit tests")
-            return state
+            return {'test_plan': test_plan}
             
         except Exception as e:
             logger.error(f"Error in test planner: {str(e)}")
-            state['test_plan'] = {"error": str(e)}
-            return state
+            return {'test_plan': {"error": str(e)}}
     
-    def generate_report(self, state: WorkflowState) -> WorkflowState:
+    def generate_report(self, state: WorkflowState) -> Dict[str, Any]:
         """
         Report Generator - Create final analysis report
         
@@ -322,7 +612,7 @@ Response format: JSON"""
             state: Current workflow state
             
         Returns:
-            Updated state with final report
+            State keys written by this node (the final report)
         """
         try:
             logger.info("Generating final report...")
@@ -331,21 +621,19 @@ Response format: JSON"""
                 "repo_id": state.get('repo_id'),
                 "branch": state.get('branch'),
                 "change_description": state.get('change_description'),
-                "timestamp": __import__('datetime').datetime.utcnow().isoformat(),
-                "impact_analysis": state.get('impact_analysis', {}),
+                "timestamp": _now().isoformat(),
+                "impact_analysis": serialize_impact_analysis(state.get('impact_analysis', {})),
                 "criticality_scores": state.get('criticality_scores', {}),
                 "test_plan": state.get('test_plan', {}),
                 "error": state.get('error')
             }
             
-            state['final_report'] = report
             logger.info("Final report generated successfully")
-            return state
+            return {'final_report': report}
             
         except Exception as e:
             logger.error(f"Error in report generator: {str(e)}")
-            state['final_report'] = {"error": str(e)}
-            return state
+            return {'final_report': {"error": str(e)}}
     
     async def execute_workflow(self, initial_state: WorkflowState) -> WorkflowState:
         """
@@ -364,7 +652,7 @@ Response format: JSON"""
             logger.info("Executing workflow...")
             
             # Invoke the workflow
-            result = self.compiled_workflow.invoke(initial_state)
+            result = await self.compiled_workflow.ainvoke(initial_state)
             
             logger.info("Workflow execution completed")
             return result
@@ -373,3 +661,62 @@ Response format: JSON"""
             logger.error(f"Workflow execution failed: {str(e)}")
             initial_state['error'] = f"Workflow failed: {str(e)}"
             return initial_state
+    
+    async def stream_workflow(self, initial_state: WorkflowState) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Execute the compiled workflow, yielding results as each node completes
+        
+        Args:
+            initial_state: Initial workflow state
+            
+        Yields:
+            (event name, payload) pairs: query_plan, dependency_analysis,
+            retrieval_summary, scores, test_plan, final_report and error
+        """
+        try:
+            if not self.compiled_workflow:
+                self.build_workflow()
+            
+            logger.info("Streaming workflow...")
+            
+            async for step in self.compiled_workflow.astream(initial_state, stream_mode="updates"):
+                for update in step.values():
+                    for event in self._stream_events(update or {}):
+                        yield event
+            
+            logger.info("Workflow streaming completed")
+            
+        except Exception as e:
+            logger.error(f"Workflow streaming failed: {str(e)}")
+            yield "error", f"Workflow failed: {str(e)}"
+    
+    def _stream_events(self, update: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """
+        Map a node's state update to stream events
+        
+        Args:
+            update: State keys written by a node
+            
+        Returns:
+            (event name, payload) pairs for the keys present in the update
+        """
+        events = []
+        if 'query_plan' in update.get('workflow_metadata', {}):
+            events.append(("query_plan", update['workflow_metadata']['query_plan']))
+        if 'impact_analysis' in update:
+            events.append(("dependency_analysis", serialize_impact_analysis(update['impact_analysis'])))
+        if 'retrieved_context' in update:
+            context = update['retrieved_context']
+            events.append(("retrieval_summary", {
+                "count": len(context),
+                "relevance_scores": [doc.get('relevance_score') for doc in context]
+            }))
+        if 'criticality_scores' in update:
+            events.append(("scores", update['criticality_scores']))
+        if 'test_plan' in update:
+            events.append(("test_plan", update['test_plan']))
+        if 'final_report' in update:
+            events.append(("final_report", update['final_report']))
+        if update.get('error'):
+            events.append(("error", update['error']))
+        return events
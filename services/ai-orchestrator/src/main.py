@@ -7,10 +7,12 @@ import logging
 import asyncio
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import json
+import orjson
 
 from rag.rag_pipeline import RAGPipeline
 from agents.workflow_orchestrator import WorkflowOrchestrator, WorkflowState
@@ -26,7 +28,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="AI Orchestrator Service",
     description="RAG and LangGraph-based impact analysis orchestration",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -50,12 +53,14 @@ async def startup_event():
     try:
         logger.info("Starting AI Orchestrator Service")
         
-        # Initialize RAG pipeline
-        rag_pipeline = RAGPipeline()
+        # Initialize RAG pipeline and workflow orchestrator concurrently
+        rag_pipeline, orchestrator = await asyncio.gather(
+            RAGPipeline.create(),
+            asyncio.to_thread(WorkflowOrchestrator)
+        )
         logger.info("RAG Pipeline initialized")
         
-        # Initialize workflow orchestrator
-        orchestrator = WorkflowOrchestrator(rag_pipeline=rag_pipeline)
+        orchestrator.rag_pipeline = rag_pipeline
         orchestrator.build_workflow()
         logger.info("Workflow Orchestrator initialized")
         
@@ -68,6 +73,10 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down AI Orchestrator Service")
+    if orchestrator:
+        await orchestrator.close()
+    if rag_pipeline:
+        await rag_pipeline.close()
 
 
 # Request/Response Models
@@ -109,6 +118,7 @@ class IndexDocumentsRequest(BaseModel):
 class RetrieveContextRequest(BaseModel):
     query: str = Field(..., description="Query for context retrieval")
     k: int = Field(default=10, description="Number of documents to retrieve")
+    ef_search: Optional[int] = Field(None, description="HNSW search beam width (16 fast, 50 balanced, 200 accurate)")
 
 
 class RetrieveContextResponse(BaseModel):
@@ -117,6 +127,34 @@ class RetrieveContextResponse(BaseModel):
     count: int
 
 
+class RetrieveContextBatchRequest(BaseModel):
+    queries: List[str] = Field(..., max_length=100, description="Queries for context retrieval")
+    k: int = Field(default=10, description="Number of documents to retrieve per query")
+    ef_search: Optional[int] = Field(None, description="HNSW search beam width (16 fast, 50 balanced, 200 accurate)")
+
+
+class RetrieveContextBatchResponse(BaseModel):
+    results: List[RetrieveContextResponse]
+
+
+def build_initial_state(analysis_id: str, request: AnalysisRequest) -> WorkflowState:
+    """Build the initial workflow state for an analysis request"""
+    return {
+        "change_description": request.change_description,
+        "affected_files": request.affected_files,
+        "repo_id": request.repo_id,
+        "branch": request.branch,
+        "dependency_graph": request.dependency_graph,
+        "retrieved_context": [],
+        "impact_analysis": {},
+        "test_plan": {},
+        "criticality_scores": {},
+        "final_report": {},
+        "error": None,
+        "workflow_metadata": {"analysis_id": analysis_id}
+    }
+
+
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -157,7 +195,7 @@ async def index_documents(request: IndexDocumentsRequest):
 
 
 # Retrieve context endpoint
-@app.post("/api/v1/context/retrieve", response_model=RetrieveContextResponse)
+@app.post("/api/v1/context/retrieve", responses={200: {"model": RetrieveContextResponse}})
 async def retrieve_context(request: RetrieveContextRequest):
     """Retrieve context from the vector store"""
     try:
@@ -166,30 +204,54 @@ async def retrieve_context(request: RetrieveContextRequest):
         
         logger.info(f"Retrieving context for query: {request.query[:100]}")
         
-        results = rag_pipeline.retrieve_context(request.query, k=request.k)
+        results = await rag_pipeline.aretrieve_context(request.query, k=request.k, ef_search=request.ef_search)
         
-        return {
+        return ORJSONResponse(content={
             "query": request.query,
             "results": results,
             "count": len(results)
-        }
+        })
     except Exception as e:
         logger.error(f"Error retrieving context: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Retrieve context for several queries endpoint
+@app.post("/api/v1/context/retrieve/batch", responses={200: {"model": RetrieveContextBatchResponse}})
+async def retrieve_context_batch(request: RetrieveContextBatchRequest):
+    """Retrieve a context set per query, embedded and searched in one round-trip"""
+    try:
+        if not rag_pipeline:
+            raise HTTPException(status_code=503, detail="RAG Pipeline not initialized")
+        
+        logger.info(f"Retrieving context for {len(request.queries)} queries")
+        
+        results = await rag_pipeline.aretrieve_contexts_batch(request.queries, k=request.k, ef_search=request.ef_search)
+        
+        return ORJSONResponse(content={
+            "results": [
+                {"query": query, "results": hits, "count": len(hits)}
+                for query, hits in zip(request.queries, results)
+            ]
+        })
+    except Exception as e:
+        logger.error(f"Error retrieving context batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Main analysis endpoint
-@app.post("/api/v1/analyze", response_model=AnalysisResponse)
+@app.post("/api/v1/analyze", responses={200: {"model": AnalysisResponse}})
 async def analyze_change(request: AnalysisRequest, background_tasks: BackgroundTasks):
     """
     Perform impact analysis on code change
     
     This endpoint triggers the complete analysis workflow:
-    1. Query planning
-    2. Dependency analysis (parallel with RAG retrieval)
-    3. Impact scoring
-    4. Test planning
-    5. Report generation
+    1. Query planning, dependency analysis and RAG retrieval (concurrent)
+    2. Impact scoring and test planning (concurrent)
+    3. Report generation
+    
+    Trivially small changes skip the LLM stages: only dependency analysis
+    runs and default low-risk scores are reported.
     """
     try:
         if not orchestrator:
@@ -201,20 +263,7 @@ async def analyze_change(request: AnalysisRequest, background_tasks: BackgroundT
         analysis_id = f"analysis_{request.repo_id}_{datetime.utcnow().timestamp()}"
         
         # Prepare initial workflow state
-        initial_state: WorkflowState = {
-            "change_description": request.change_description,
-            "affected_files": request.affected_files,
-            "repo_id": request.repo_id,
-            "branch": request.branch,
-            "dependency_graph": request.dependency_graph,
-            "retrieved_context": [],
-            "impact_analysis": {},
-            "test_plan": {},
-            "criticality_scores": {},
-            "final_report": {},
-            "error": None,
-            "workflow_metadata": {"analysis_id": analysis_id}
-        }
+        initial_state = build_initial_state(analysis_id, request)
         
         # Execute workflow
         try:
@@ -224,20 +273,21 @@ async def analyze_change(request: AnalysisRequest, background_tasks: BackgroundT
             final_state = initial_state
             final_state["error"] = str(e)
         
-        # Format response
-        return {
+        # Format response; returned as ORJSONResponse to skip response model
+        # validation and re-encoding of the large nested report
+        return ORJSONResponse(content={
             "analysis_id": analysis_id,
             "status": "completed" if not final_state.get("error") else "failed",
             "timestamp": datetime.utcnow().isoformat(),
             "repo_id": request.repo_id,
             "branch": request.branch,
             "change_description": request.change_description,
-            "impact_analysis": final_state.get("impact_analysis", {}),
+            "impact_analysis": final_state.get("final_report", {}).get("impact_analysis", {}),
             "criticality_scores": final_state.get("criticality_scores", {}),
             "test_plan": final_state.get("test_plan", {}),
             "final_report": final_state.get("final_report", {}),
             "error": final_state.get("error")
-        }
+        })
         
     except HTTPException:
         raise
@@ -246,6 +296,41 @@ async def analyze_change(request: AnalysisRequest, background_tasks: BackgroundT
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Streaming analysis endpoint
+@app.post("/api/v1/analyze/stream")
+async def analyze_change_stream(request: AnalysisRequest):
+    """
+    Perform impact analysis on code change, streaming results as server-sent events
+    
+    Emits analysis_started, then query_plan, dependency_analysis and
+    retrieval_summary, then scores and test_plan, then final_report, as each
+    workflow stage completes. Failures are sent as error events.
+    """
+    if not orchestrator:
+        raise HTTPException(status_code=503, detail="Orchestrator not initialized")
+    
+    analysis_id = f"analysis_{request.repo_id}_{datetime.utcnow().timestamp()}"
+    logger.info(f"Starting streamed impact analysis: {analysis_id}")
+    
+    initial_state = build_initial_state(analysis_id, request)
+    
+    async def event_stream():
+        yield format_sse("analysis_started", {"analysis_id": analysis_id})
+        async for event, data in orchestrator.stream_workflow(initial_state):
+            yield format_sse(event, data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    """Encode one server-sent event with a JSON payload"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, default=str) + b"\n\n"
+
+
 # Async analysis endpoint for long-running operations
 @app.post("/api/v1/analyze/async")
 async def analyze_change_async(request: AnalysisRequest, background_tasks: BackgroundTasks):
@@ -284,20 +369,7 @@ async def run_analysis_async(analysis_id: str, request: AnalysisRequest):
     try:
         logger.info(f"Running async analysis: {analysis_id}")
         
-        initial_state: WorkflowState = {
-            "change_description": request.change_description,
-            "affected_files": request.affected_files,
-            "repo_id": request.repo_id,
-            "branch": request.branch,
-            "dependency_graph": request.dependency_graph,
-            "retrieved_context": [],
-            "impact_analysis": {},
-            "test_plan": {},
-            "criticality_scores": {},
-            "final_report": {},
-            "error": None,
-            "workflow_metadata": {"analysis_id": analysis_id}
-        }
+        initial_state = build_initial_state(analysis_id, request)
         
         result = await orchestrator.execute_workflow(initial_state)
         logger.info(f"Async analysis completed: {analysis_id}")
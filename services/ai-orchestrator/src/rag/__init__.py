@@ -1,6 +1,7 @@
 """
 RAG Module - Retrieval Augmented Generation components
 """
-from .rag_pipeline import RAGPipeline
+from .rag_pipeline import RAGPipeline, SearchQuality
+from .semantic_cache import SemanticResponseCache
 
-__all__ = ['RAGPipeline']
+__all__ = ['RAGPipeline', 'SearchQuality', 'SemanticResponseCache']
@@ -0,0 +1,87 @@
+"""
+Adaptive ef - Tunes the HNSW search beam width from observed query latency
+"""
+import logging
+import statistics
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveEfController:
+    """
+    Latency-driven controller for the HNSW ef_search parameter
+
+    Keeps a sliding window of (latency_ms, ef_used) samples. Once enough
+    samples are collected, the median latency is compared to the target:
+    over target the beam is narrowed, under target the headroom is spent on
+    a wider (higher recall) beam. The window is reset after each adjustment
+    so the next decision only sees queries run with the new value.
+    """
+
+    def __init__(self, initial_ef: int = 50, target_latency_ms: float = 50.0,
+                 adaptation_rate: float = 0.1, min_ef: int = 16, max_ef: int = 512,
+                 window: int = 100, min_queries_for_adaptation: int = 20,
+                 tolerance: float = 0.1):
+        """
+        Initialize controller
+
+        Args:
+            initial_ef: Starting ef_search
+            target_latency_ms: Median per-query latency to aim for
+            adaptation_rate: Relative ef change per adjustment
+            min_ef: Lower bound for ef_search
+            max_ef: Upper bound for ef_search
+            window: Number of recent samples kept
+            min_queries_for_adaptation: Samples needed before adjusting
+            tolerance: Relative band around the target with no adjustment
+        """
+        self.target_latency_ms = target_latency_ms
+        self.adaptation_rate = adaptation_rate
+        self.min_ef = min_ef
+        self.max_ef = max_ef
+        self.min_queries = min(min_queries_for_adaptation, window)
+        self.tolerance = tolerance
+        self._ef = float(min(max(initial_ef, min_ef), max_ef))
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def ef(self) -> int:
+        """Current ef_search value"""
+        return int(round(self._ef))
+
+    def record(self, latency_ms: float, ef_used: int):
+        """
+        Record a query and adjust ef_search when the window is full enough
+
+        Args:
+            latency_ms: Per-query search latency
+            ef_used: ef_search the query ran with
+        """
+        with self._lock:
+            self._samples.append((latency_ms, ef_used))
+            if len(self._samples) < self.min_queries:
+                return
+
+            median_latency = statistics.median(latency for latency, _ in self._samples)
+            if median_latency > self.target_latency_ms * (1 + self.tolerance):
+                self._ef *= 1 - self.adaptation_rate
+            elif median_latency < self.target_latency_ms * (1 - self.tolerance):
+                self._ef *= 1 + self.adaptation_rate
+            else:
+                return
+
+            self._ef = min(max(self._ef, self.min_ef), self.max_ef)
+            self._samples.clear()
+            logger.debug(f"Median search latency {median_latency:.1f} ms, ef_search now {self.ef}")
+
+    def stats(self) -> dict:
+        """Get the current ef_search and window state"""
+        with self._lock:
+            return {
+                "ef_search": self.ef,
+                "target_latency_ms": self.target_latency_ms,
+                "samples": len(self._samples)
+            }
@@ -0,0 +1,82 @@
+"""
+Local Embeddings - Sentence-transformers model served in process
+"""
+import logging
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by a local sentence-transformers model
+
+    Indexing is bound by embedding throughput; a local model encodes
+    hundreds of chunks per forward pass instead of paying a network round
+    trip per batch. On CUDA the model runs in FP16. Embeddings are L2
+    normalized, so cosine distance in the vector store matches the model's
+    training objective.
+    """
+
+    def __init__(self, model_name: str = "BAAI/bge-small-en-v1.5",
+                 device: Optional[str] = None, batch_size: int = 512):
+        """
+        Initialize model
+
+        Args:
+            model_name: sentence-transformers model name or path
+            device: Torch device, or None to pick CUDA when available
+            batch_size: Texts per forward pass
+
+        Raises:
+            ImportError: If sentence-transformers is not installed
+        """
+        if SentenceTransformer is None:
+            raise ImportError("sentence-transformers is required for EMBED_BACKEND=local")
+
+        self.model = SentenceTransformer(model_name, device=device)
+        if self.model.device.type == "cuda":
+            self.model.half()
+        self.batch_size = batch_size
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+        logger.info(f"Loaded local embedding model {model_name} ({self.dimensions}-d) on {self.model.device}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of documents
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One embedding per text
+        """
+        if not texts:
+            return []
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return vectors.astype("float32").tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query
+
+        Args:
+            text: Query text
+
+        Returns:
+            Query embedding
+        """
+        return self.embed_documents([text])[0]
@@ -2,55 +2,155 @@
 RAG Pipeline - Retrieval Augmented Generation for code analysis
 """
 import os
+import time
+import hashlib
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
 from typing import List, Dict, Any, Optional
+import chromadb
+import httpx
+import semchunk
+import tiktoken
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 from langchain.callbacks import StreamingStdOutCallbackHandler
 
+from .adaptive_ef import AdaptiveEfController
+from .local_embeddings import LocalEmbeddings
+from .semantic_cache import SemanticResponseCache
+
 logger = logging.getLogger(__name__)
 
 
+class SearchQuality(IntEnum):
+    """HNSW search beam widths (ef_search) trading latency for recall"""
+    FAST = 16
+    BALANCED = 50
+    ACCURATE = 200
+
+
+def _log_cpu_isa():
+    """Log the SIMD extensions available to the vector index distance kernels"""
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            flags = next((line.split(":", 1)[1].split() for line in cpuinfo if line.startswith("flags")), [])
+    except OSError:
+        return
+    
+    isa = [ext for ext in ("avx512f", "avx512vl", "avx2", "fma", "sse4_2") if ext in flags]
+    logger.info(f"CPU SIMD extensions: {', '.join(isa) or 'none detected'}")
+
+
 class RAGPipeline:
     """Retrieval Augmented Generation pipeline for code analysis"""
     
+    DEFAULT_SYSTEM_PROMPT = """You are an expert software architect analyzing code changes.
+            Use the provided context to analyze the code structure and dependencies.
+            Provide clear, structured analysis in JSON format."""
+    
     def __init__(self):
         """Initialize RAG components"""
         try:
-            # Initialize embeddings
-            self.embeddings = OpenAIEmbeddings(
-                model=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"),
-                api_key=os.getenv("OPENAI_API_KEY")
+            # Settings read once; the request path only uses these attributes
+            self._top_k = int(os.getenv("TOP_K_RETRIEVAL", "10"))
+            self._default_ef = int(os.getenv("RAG_EF_SEARCH", str(int(SearchQuality.BALANCED))))
+            self._collection_name = os.getenv("CHROMADB_COLLECTION_NAME", "code_analysis")
+            self._persist_dir = os.getenv("CHROMADB_PERSIST_DIR", "./chroma_db")
+            self._chroma_host = os.getenv("CHROMA_HOST")
+            self._chroma_port = int(os.getenv("CHROMA_PORT", "8000"))
+            self._embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+            self._embedding_concurrency = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+            self._dedup_lookup_batch_size = int(os.getenv("DEDUP_LOOKUP_BATCH_SIZE", "1000"))
+            self._context_snippet_len = int(os.getenv("CTX_SNIPPET_LEN", "500"))
+            
+            # Pooled HTTP/2 clients shared by the embeddings and LLM so OpenAI
+            # connections stay warm across calls; the sync client serves the
+            # threaded indexing and retrieval paths
+            http_timeout = float(os.getenv("OPENAI_HTTP_TIMEOUT_S", "60"))
+            http_limits = httpx.Limits(
+                max_connections=int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "50"))
             )
+            self._http_client = httpx.Client(http2=True, timeout=http_timeout, limits=http_limits)
+            self._http_async_client = httpx.AsyncClient(http2=True, timeout=http_timeout, limits=http_limits)
+            
+            # Initialize embeddings
+            self.embedding_backend = os.getenv("EMBED_BACKEND", "openai").lower()
+            if self.embedding_backend == "local":
+                # In-process model; large batches already saturate the device,
+                # so batches are encoded one at a time
+                self.embeddings = LocalEmbeddings(
+                    model_name=os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5"),
+                    device=os.getenv("LOCAL_EMBEDDING_DEVICE") or None,
+                    batch_size=self._embedding_batch_size
+                )
+                self.embedding_dimensions = self.embeddings.dimensions
+                self._embedding_concurrency = 1
+            else:
+                # OpenAI embeddings, truncated to a shorter (Matryoshka) dimensionality
+                self.embedding_dimensions = int(os.getenv("OPENAI_EMBEDDING_DIM", "256"))
+                self.embeddings = OpenAIEmbeddings(
+                    model=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small"),
+                    dimensions=self.embedding_dimensions,
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    http_client=self._http_client,
+                    http_async_client=self._http_async_client
+                )
             
             # Initialize LLM
             self.llm = ChatOpenAI(
                 model=os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview"),
                 temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.2")),
                 max_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "4000")),
-                api_key=os.getenv("OPENAI_API_KEY")
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=self._http_client,
+                http_async_client=self._http_async_client
             )
             
+            # Prompt context is budgeted in the LLM's own tokens
+            self._max_ctx_tokens = int(os.getenv("MAX_CTX_TOKENS", "2000"))
+            try:
+                self._prompt_encoding = tiktoken.encoding_for_model(self.llm.model_name)
+            except KeyError:
+                self._prompt_encoding = tiktoken.get_encoding("cl100k_base")
+            
             # Initialize ChromaDB vector store
-            persist_dir = os.getenv("CHROMADB_PERSIST_DIR", "./chroma_db")
-            os.makedirs(persist_dir, exist_ok=True)
+            _log_cpu_isa()
+            self.vector_store = self._open_vector_store()
+            self._check_embedding_dimensions()
             
-            self.vector_store = Chroma(
-                collection_name=os.getenv("CHROMADB_COLLECTION_NAME", "code_analysis"),
-                embedding_function=self.embeddings,
-                persist_directory=persist_dir
-            )
+            # ef_search for queries without an explicit profile, tuned from observed latency
+            self._ef_ctrl = None
+            if os.getenv("RAG_ADAPTIVE_EF", "true").lower() == "true":
+                self._ef_ctrl = AdaptiveEfController(
+                    initial_ef=self._default_ef,
+                    target_latency_ms=float(os.getenv("RAG_TARGET_LATENCY_MS", "50"))
+                )
             
-            # Initialize text splitter
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=int(os.getenv("CHUNK_SIZE", "1000")),
-                chunk_overlap=int(os.getenv("CHUNK_OVERLAP", "200")),
-                separators=["\n\n", "\n", " ", ""]
+            # Semantic cache of generated responses, stored next to the documents
+            self.semantic_cache = None
+            if os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true":
+                self.semantic_cache = SemanticResponseCache(
+                    self.vector_store._client,
+                    collection_name=f"rag_response_cache_{self.embedding_dimensions}",
+                    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+                    ttl_s=float(os.getenv("SEMANTIC_CACHE_TTL_S", str(7 * 24 * 3600)))
+                )
+            
+            # Initialize text splitter; chunk sizes are counted in embedding
+            # model tokens, with token counts memoized across recursion levels
+            self.text_splitter = semchunk.chunkerify(
+                tiktoken.get_encoding(os.getenv("CHUNK_TOKENIZER", "cl100k_base")),
+                chunk_size=int(os.getenv("CHUNK_SIZE_TOKENS", "256"))
             )
+            self._chunk_overlap = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+            # Large indexing requests are chunked across worker processes
+            self._chunk_processes = int(os.getenv("CHUNK_PROCESSES", str(os.cpu_count() or 1)))
+            self._chunk_parallel_min_docs = int(os.getenv("CHUNK_PARALLEL_MIN_DOCS", "32"))
             
             logger.info("RAG Pipeline initialized successfully")
             
@@ -58,6 +158,74 @@ class RAGPipeline:
             logger.error(f"Error initializing RAG Pipeline: {str(e)}")
             raise
     
+    def _open_vector_store(self) -> Chroma:
+        """
+        Open the Chroma collection
+        
+        When CHROMA_HOST is set the collection lives in a shared Chroma
+        server, so any number of API workers can use it without each one
+        loading the index into memory. Otherwise a local persistent
+        collection is used, which is only safe with a single worker.
+        
+        Returns:
+            Chroma vector store
+        """
+        # HNSW parameters only apply when the collection is created. search_ef
+        # is the floor of the beam width; queries widen it per call (see _search)
+        collection_metadata = {
+            "hnsw:space": os.getenv("CHROMA_HNSW_SPACE", "cosine"),
+            "hnsw:M": int(os.getenv("CHROMA_HNSW_M", "32")),
+            "hnsw:construction_ef": int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "200")),
+            "hnsw:search_ef": int(os.getenv("CHROMA_HNSW_SEARCH_EF", str(int(SearchQuality.FAST))))
+        }
+        
+        if self._chroma_host:
+            client = chromadb.HttpClient(host=self._chroma_host, port=self._chroma_port)
+            logger.info(f"Using Chroma server at {self._chroma_host}")
+            return Chroma(
+                collection_name=self._collection_name,
+                embedding_function=self.embeddings,
+                client=client,
+                collection_metadata=collection_metadata
+            )
+        
+        os.makedirs(self._persist_dir, exist_ok=True)
+        return Chroma(
+            collection_name=self._collection_name,
+            embedding_function=self.embeddings,
+            persist_directory=self._persist_dir,
+            collection_metadata=collection_metadata
+        )
+    
+    def _check_embedding_dimensions(self):
+        """Warn when the collection holds vectors of a different dimensionality"""
+        try:
+            stored = self.vector_store._collection.peek(1).get("embeddings") or []
+        except Exception as e:
+            logger.warning(f"Could not inspect stored embeddings: {str(e)}")
+            return
+        
+        if stored and len(stored[0]) != self.embedding_dimensions:
+            logger.error(
+                f"Collection holds {len(stored[0])}-d embeddings but the {self.embedding_backend} "
+                f"embedding backend produces {self.embedding_dimensions}-d; clear the collection "
+                f"and re-index the documents"
+            )
+    
+    @classmethod
+    async def create(cls) -> "RAGPipeline":
+        """
+        Build a pipeline without blocking the event loop
+        
+        Opening the persisted Chroma collection is blocking I/O, so the
+        constructor runs in a worker thread and can overlap with other
+        startup work.
+        
+        Returns:
+            Initialized RAG pipeline
+        """
+        return await asyncio.to_thread(cls)
+    
     def index_documents(self, documents: List[str], metadata: List[Dict] = None) -> int:
         """
         Index documents in the vector store
@@ -83,41 +251,149 @@ class RAGPipeline:
                 logger.warning(f"Metadata count ({len(metadata)}) doesn't match documents ({len(documents)})")
                 metadata = metadata + [{}] * (len(documents) - len(metadata))
             
-            # Split documents into chunks
-            doc_objects = []
-            for i, (doc_text, meta) in enumerate(zip(documents, metadata)):
-                # Split into chunks
-                chunks = self.text_splitter.split_text(doc_text)
-                
+            # Split all documents into chunks in one call, spread over worker
+            # processes when there are enough documents to amortize start-up
+            processes = self._chunk_processes if len(documents) >= self._chunk_parallel_min_docs else 1
+            chunk_lists = self.text_splitter(documents, processes=processes, overlap=self._chunk_overlap)
+            
+            # Flatten into id/text/metadata lists. Ids are content hashes, so
+            # a chunk repeated in this request or already stored is not re-embedded
+            ids = []
+            texts = []
+            metadatas = []
+            seen = set()
+            for i, (chunks, meta) in enumerate(zip(chunk_lists, metadata)):
                 for j, chunk in enumerate(chunks):
-                    meta_with_position = {
+                    content_hash = hashlib.blake2b(chunk.encode(), digest_size=16).hexdigest()
+                    if content_hash in seen:
+                        continue
+                    seen.add(content_hash)
+                    ids.append(content_hash)
+                    texts.append(chunk)
+                    metadatas.append({
                         **meta,
                         "doc_index": i,
                         "chunk_index": j,
-                        "total_chunks": len(chunks)
-                    }
-                    
-                    doc_obj = Document(page_content=chunk, metadata=meta_with_position)
-                    doc_objects.append(doc_obj)
+                        "total_chunks": len(chunks),
+                        "content_hash": content_hash
+                    })
+            chunk_count = len(texts)
+            
+            existing = set()
+            lookup_size = self._dedup_lookup_batch_size
+            for start in range(0, len(ids), lookup_size):
+                stored = self.vector_store._collection.get(ids=ids[start:start + lookup_size], include=[])
+                existing.update(stored["ids"])
+            if existing:
+                keep = [n for n, content_hash in enumerate(ids) if content_hash not in existing]
+                ids = [ids[n] for n in keep]
+                texts = [texts[n] for n in keep]
+                metadatas = [metadatas[n] for n in keep]
+            
+            # Embed in fixed-size batches, several requests in flight at once
+            batch_size = self._embedding_batch_size
+            batches = [(start, texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+            
+            with ThreadPoolExecutor(max_workers=self._embedding_concurrency) as executor:
+                vectors = executor.map(lambda batch: self.embeddings.embed_documents(batch[1]), batches)
+                
+                # Add each batch to the vector store as soon as it is embedded
+                for (start, batch_texts), batch_vectors in zip(batches, vectors):
+                    self.vector_store._collection.add(
+                        ids=ids[start:start + len(batch_texts)],
+                        embeddings=batch_vectors,
+                        documents=batch_texts,
+                        metadatas=metadatas[start:start + len(batch_texts)]
+                    )
             
-            # Add to vector store
-            self.vector_store.add_documents(doc_objects)
-            self.vector_store.persist()
+            if texts and not self._chroma_host:
+                self.vector_store.persist()
             
-            logger.info(f"Successfully indexed {len(doc_objects)} chunks from {len(documents)} documents")
-            return len(doc_objects)
+            logger.info(
+                f"Successfully indexed {chunk_count} chunks from {len(documents)} documents "
+                f"({len(texts)} new, {chunk_count - len(texts)} unchanged)"
+            )
+            return chunk_count
             
         except Exception as e:
             logger.error(f"Error indexing documents: {str(e)}")
             raise
     
-    def retrieve_context(self, query: str, k: int = None) -> List[Dict[str, Any]]:
+    def _search(self, query_embeddings: List[List[float]], k: int,
+                ef_search: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Nearest-neighbour search for one or more query embeddings
+        
+        HNSW searches with a beam of max(search_ef, n_results), so asking
+        for ef_search candidates and keeping the best k widens the beam for
+        this call only. Chroma has no per-query ef setting, and changing
+        the collection's search_ef does not reach an index already loaded.
+        
+        Args:
+            query_embeddings: One embedding per query
+            k: Number of documents to return per query
+            ef_search: Search beam width (defaults to the adaptive controller's
+                value, or RAG_EF_SEARCH when adaptation is disabled)
+            
+        Returns:
+            Per query, the k nearest documents with ids and relevance scores
+        """
+        collection = self.vector_store._collection
+        adaptive = ef_search is None and self._ef_ctrl is not None
+        if adaptive:
+            ef_search = self._ef_ctrl.ef
+        else:
+            ef_search = ef_search or self._default_ef
+        oversample = ef_search > k
+        
+        started = time.perf_counter()
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=max(k, ef_search),
+            include=["distances"] if oversample else ["documents", "metadatas", "distances"]
+        )
+        if adaptive:
+            latency_ms = (time.perf_counter() - started) * 1000 / max(1, len(query_embeddings))
+            self._ef_ctrl.record(latency_ms, ef_search)
+        
+        hits = [(ids[:k], distances[:k]) for ids, distances in zip(results["ids"], results["distances"])]
+        if oversample:
+            # Only the kept candidates' documents are fetched
+            wanted = list({chunk_id for ids, _ in hits for chunk_id in ids})
+            fetched = collection.get(ids=wanted, include=["documents", "metadatas"]) if wanted else {
+                "ids": [], "documents": [], "metadatas": []
+            }
+            documents = dict(zip(fetched["ids"], zip(fetched["documents"], fetched["metadatas"])))
+        else:
+            documents = {
+                chunk_id: (document, metadata)
+                for ids, docs, metas in zip(results["ids"], results["documents"], results["metadatas"])
+                for chunk_id, document, metadata in zip(ids, docs, metas)
+            }
+        
+        relevance_score_fn = self.vector_store._select_relevance_score_fn()
+        return [
+            [
+                {
+                    "id": chunk_id,
+                    "content": documents[chunk_id][0],
+                    "metadata": documents[chunk_id][1] or {},
+                    "relevance_score": float(relevance_score_fn(distance))
+                }
+                for chunk_id, distance in zip(ids, distances)
+                if chunk_id in documents
+            ]
+            for ids, distances in hits
+        ]
+    
+    def retrieve_context(self, query: str, k: int = None, ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents from the vector store
         
         Args:
             query: Query string for semantic search
             k: Number of documents to retrieve
+            ef_search: Search beam width, e.g. a SearchQuality profile
             
         Returns:
             List of retrieved documents with scores
@@ -127,21 +403,12 @@ class RAGPipeline:
                 logger.warning("Empty query provided")
                 return []
             
-            k = k or int(os.getenv("TOP_K_RETRIEVAL", "10"))
+            k = k or self._top_k
             
             logger.debug(f"Retrieving {k} documents for query: {query[:100]}")
             
             # Perform similarity search
-            results = self.vector_store.similarity_search_with_relevance_scores(query, k=k)
-            
-            # Format results
-            retrieved_docs = []
-            for doc, score in results:
-                retrieved_docs.append({
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "relevance_score": float(score)
-                })
+            retrieved_docs = self._search([self.embeddings.embed_query(query)], k, ef_search)[0]
             
             logger.debug(f"Retrieved {len(retrieved_docs)} documents with scores")
             return retrieved_docs
@@ -150,6 +417,94 @@ class RAGPipeline:
             logger.error(f"Error retrieving context: {str(e)}")
             return []
     
+    def retrieve_contexts_batch(self, queries: List[str], k: int = None,
+                                ef_search: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve a separate result list for each of several queries
+        
+        All queries are embedded in a single embeddings request and searched
+        with a single vector store query, which hnswlib runs across its own
+        threads. Blank queries get an empty list.
+        
+        Args:
+            queries: Query strings for semantic search
+            k: Number of documents to retrieve per query
+            ef_search: Search beam width, e.g. a SearchQuality profile
+            
+        Returns:
+            Per query, the retrieved documents with scores, best first
+        """
+        try:
+            positions = [n for n, query in enumerate(queries) if query and query.strip()]
+            results = [[] for _ in queries]
+            if not positions:
+                logger.warning("Empty query batch provided")
+                return results
+            
+            k = k or self._top_k
+            
+            logger.debug(f"Retrieving {k} documents for each of {len(positions)} queries")
+            
+            query_embeddings = self.embeddings.embed_documents([queries[n] for n in positions])
+            for n, hits in zip(positions, self._search(query_embeddings, k, ef_search)):
+                results[n] = hits
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error retrieving contexts batch: {str(e)}")
+            return [[] for _ in queries]
+    
+    def retrieve_context_batch(self, queries: List[str], k: int = None,
+                               ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve documents for several queries in one round-trip
+        
+        Runs retrieve_contexts_batch and merges the hits by chunk id.
+        
+        Args:
+            queries: Query strings for semantic search
+            k: Number of documents to retrieve per query and in total
+            ef_search: Search beam width, e.g. a SearchQuality profile
+            
+        Returns:
+            Deduplicated list of retrieved documents with scores, best first
+        """
+        k = k or self._top_k
+        
+        # Merge per-query hits, keeping the best score for each chunk
+        merged = {}
+        for hits in self.retrieve_contexts_batch(queries, k, ef_search):
+            for doc in hits:
+                best = merged.get(doc["id"])
+                if best is None or doc["relevance_score"] > best["relevance_score"]:
+                    merged[doc["id"]] = doc
+        
+        retrieved_docs = sorted(merged.values(), key=lambda doc: doc["relevance_score"], reverse=True)[:k]
+        
+        logger.debug(f"Retrieved {len(retrieved_docs)} documents for query batch")
+        return retrieved_docs
+    
+    async def aretrieve_context(self, query: str, k: int = None,
+                                ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Async variant of retrieve_context that keeps the event loop free
+        
+        The Chroma client and embeddings call are blocking, so the search
+        runs in a worker thread.
+        """
+        return await asyncio.to_thread(self.retrieve_context, query, k, ef_search)
+    
+    async def aretrieve_context_batch(self, queries: List[str], k: int = None,
+                                      ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Async variant of retrieve_context_batch (runs in a worker thread)"""
+        return await asyncio.to_thread(self.retrieve_context_batch, queries, k, ef_search)
+    
+    async def aretrieve_contexts_batch(self, queries: List[str], k: int = None,
+                                       ef_search: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """Async variant of retrieve_contexts_batch (runs in a worker thread)"""
+        return await asyncio.to_thread(self.retrieve_contexts_batch, queries, k, ef_search)
+    
     def generate_response(self, query: str, context: List[Dict] = None, system_prompt: str = None) -> Dict[str, Any]:
         """
         Generate response using LLM with retrieved context
@@ -167,6 +522,22 @@ class RAGPipeline:
             if context is None:
                 context = self.retrieve_context(query)
             
+            # Serve paraphrases of earlier queries over the same context from the cache
+            cache_key = None
+            if self.semantic_cache:
+                try:
+                    cache_key = (
+                        self.embeddings.embed_query(query),
+                        self.semantic_cache.context_hash(context, system_prompt)
+                    )
+                    cached = self.semantic_cache.lookup(*cache_key)
+                    if cached is not None:
+                        logger.debug(f"Semantic cache hit for query: {query[:100]}")
+                        return {**cached, "query": query, "cache_hit": True}
+                except Exception as e:
+                    logger.warning(f"Semantic cache lookup failed: {str(e)}")
+                    cache_key = None
+            
             # Build augmented prompt
             augmented_prompt = self._build_augmented_prompt(query, context, system_prompt)
             
@@ -182,8 +553,14 @@ class RAGPipeline:
                 "context_sources": [doc['metadata'] for doc in context]
             }
             
+            if cache_key:
+                try:
+                    self.semantic_cache.store(query, cache_key[0], cache_key[1], result)
+                except Exception as e:
+                    logger.warning(f"Semantic cache store failed: {str(e)}")
+            
             logger.debug("Response generated successfully")
-            return result
+            return {**result, "cache_hit": False}
             
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
@@ -206,19 +583,28 @@ class RAGPipeline:
             Formatted augmented prompt
         """
         # Default system prompt if not provided
-        if not system_prompt:
-            system_prompt = """You are an expert software architect analyzing code changes.
-            Use the provided context to analyze the code structure and dependencies.
-            Provide clear, structured analysis in JSON format."""
+        system_prompt = system_prompt or self.DEFAULT_SYSTEM_PROMPT
         
-        # Format context
+        # Format context, most relevant first, until the token budget is spent;
+        # parts are joined once instead of growing a string per doc
         context_text = ""
         if context:
-            context_text = "Context from codebase:\n"
-            for i, doc in enumerate(context, 1):
-                relevance = doc.get('relevance_score', 0)
-                context_text += f"\n--- Source {i} (Relevance: {relevance:.2f}) ---\n"
-                context_text += doc['content'][:500] + "...\n"
+            snippet_len = self._context_snippet_len
+            budget = self._max_ctx_tokens
+            sections = []
+            for doc in sorted(context, key=lambda doc: doc.get('relevance_score', 0), reverse=True):
+                section = (
+                    f"\n--- Source {len(sections) + 1} (Relevance: {doc.get('relevance_score', 0):.2f}) ---\n"
+                    f"{doc['content'][:snippet_len]}...\n"
+                )
+                budget -= len(self._prompt_encoding.encode_ordinary(section))
+                if budget < 0:
+                    break
+                sections.append(section)
+            
+            if len(sections) < len(context):
+                logger.debug(f"Context token budget reached, using {len(sections)} of {len(context)} documents")
+            context_text = "".join(["Context from codebase:\n", *sections])
         
         # Build full prompt
         full_prompt = f"""{system_prompt}
@@ -231,15 +617,17 @@ Analysis:"""
         
         return full_prompt
     
+    async def close(self):
+        """Close the pooled HTTP clients"""
+        self._http_client.close()
+        await self._http_async_client.aclose()
+    
     def clear_collection(self):
         """Clear all documents from the vector store"""
         try:
             # Delete and recreate collection
-            self.vector_store = Chroma(
-                collection_name=os.getenv("CHROMADB_COLLECTION_NAME", "code_analysis"),
-                embedding_function=self.embeddings,
-                persist_directory=os.getenv("CHROMADB_PERSIST_DIR", "./chroma_db")
-            )
+            self.vector_store.delete_collection()
+            self.vector_store = self._open_vector_store()
             logger.info("Vector store cleared")
         except Exception as e:
             logger.error(f"Error clearing vector store: {str(e)}")
@@ -249,10 +637,16 @@ Analysis:"""
         """Get statistics about the vector store"""
         try:
             collection = self.vector_store._collection
+            document_count = collection.count()
             return {
                 "collection_name": collection.name,
-                "document_count": collection.count(),
-                "metadata_schema": collection.metadata_schema if hasattr(collection, 'metadata_schema') else {}
+                "document_count": document_count,
+                "embedding_dimensions": self.embedding_dimensions,
+                # Raw float32 vector payload, excluding HNSW graph links
+                "vector_bytes": document_count * self.embedding_dimensions * 4,
+                "metadata_schema": collection.metadata_schema if hasattr(collection, 'metadata_schema') else {},
+                "semantic_cache": self.semantic_cache.stats() if self.semantic_cache else None,
+                "adaptive_ef": self._ef_ctrl.stats() if self._ef_ctrl else None
             }
         except Exception as e:
             logger.error(f"Error getting collection stats: {str(e)}")
@@ -0,0 +1,132 @@
+"""
+Semantic Cache - Reuses LLM responses for semantically equivalent queries
+"""
+import hashlib
+import logging
+import time
+from typing import List, Dict, Any, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticResponseCache:
+    """
+    Response cache keyed by query embedding
+
+    Entries live in a dedicated Chroma collection using cosine distance. A
+    lookup returns the nearest cached response when its similarity reaches
+    the threshold and it was generated from the same context (compared by
+    context hash), so a paraphrased query only reuses an answer grounded in
+    identical source documents. Entries expire after the TTL; expired
+    entries are swept lazily during lookups.
+    """
+
+    def __init__(self, client, collection_name: str = "rag_response_cache",
+                 threshold: float = 0.92, ttl_s: float = 7 * 24 * 3600,
+                 sweep_interval_s: float = 3600):
+        """
+        Initialize cache
+
+        Args:
+            client: Chroma client to store the cache collection in
+            collection_name: Name of the cache collection
+            threshold: Minimum cosine similarity for a cache hit
+            ttl_s: Lifetime of a cached response in seconds
+            sweep_interval_s: Minimum time between expiry sweeps
+        """
+        self.collection = client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+        self.threshold = threshold
+        self.ttl = ttl_s
+        self.sweep_interval = sweep_interval_s
+        self._next_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def context_hash(context: List[Dict], system_prompt: Optional[str] = None) -> str:
+        """
+        Hash the context documents and system prompt a response was built from
+
+        Args:
+            context: Retrieved context documents
+            system_prompt: System prompt used for the response
+
+        Returns:
+            Hex digest identifying the context
+        """
+        digest = hashlib.sha1((system_prompt or "").encode())
+        for content in sorted(doc.get('content', '') for doc in context):
+            digest.update(b"\0")
+            digest.update(content.encode())
+        return digest.hexdigest()
+
+    def lookup(self, embedding: List[float], ctx_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a query embedding
+
+        Args:
+            embedding: Query embedding
+            ctx_hash: Hash of the context the response must be built from
+
+        Returns:
+            Cached response dict, or None on a miss
+        """
+        now = time.time()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=1,
+            where={"ctx_hash": ctx_hash},
+            include=["documents", "metadatas", "distances"]
+        )
+
+        if results["ids"] and results["ids"][0]:
+            similarity = 1.0 - results["distances"][0][0]
+            created_at = results["metadatas"][0][0].get("created_at", 0)
+            if similarity >= self.threshold and now - created_at < self.ttl:
+                self.hits += 1
+                return orjson.loads(results["documents"][0][0])
+
+        self.misses += 1
+        return None
+
+    def store(self, query: str, embedding: List[float], ctx_hash: str, response: Dict[str, Any]):
+        """
+        Cache a generated response
+
+        Args:
+            query: Query the response answers
+            embedding: Query embedding
+            ctx_hash: Hash of the context the response was built from
+            response: Response dict to cache
+        """
+        entry_id = hashlib.sha1(f"{ctx_hash}:{query}".encode()).hexdigest()
+        self.collection.upsert(
+            ids=[entry_id],
+            embeddings=[embedding],
+            documents=[orjson.dumps(response).decode()],
+            metadatas=[{"query": query[:1000], "ctx_hash": ctx_hash, "created_at": time.time()}]
+        )
+
+    def sweep(self, now: Optional[float] = None):
+        """Delete expired entries"""
+        now = now or time.time()
+        self.collection.delete(where={"created_at": {"$lt": now - self.ttl}})
+        self._next_sweep = now + self.sweep_interval
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and cache size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.collection.count(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -1,15 +1,67 @@
 """
 Security Module - Input validation, sanitization, and security utilities
 """
+import os
 import re
+import time
 import logging
-from typing import Optional, Dict, Any
+from collections import defaultdict, deque
+from typing import Optional, Dict, Any, List, Set, Deque
 from pydantic import BaseModel, Field, validator, ValidationError
 from enum import Enum
 
+try:
+    import hyperscan
+except ImportError:  # Optional; not built for every platform (e.g. ARM)
+    hyperscan = None
+
+try:
+    import redis
+except ImportError:  # Optional; only needed for the shared rate limiter
+    redis = None
+
 logger = logging.getLogger(__name__)
 
 
+def _compile_alternation(patterns: List[str], flags: int = 0) -> "re.Pattern":
+    """
+    Compile patterns into a single alternation scanned in one pass
+    
+    Each pattern is wrapped in a named group p<index>, so the matching
+    pattern can be recovered from match.lastgroup.
+    """
+    return re.compile("|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(patterns)), flags)
+
+
+def _compile_hyperscan(patterns: List[str]) -> Optional["hyperscan.Database"]:
+    """
+    Compile case-insensitive patterns into a Hyperscan database for ASCII input
+    
+    Hyperscan matches bytes with ASCII-only case folding and whitespace
+    classes (and rejects word boundaries in its Unicode mode), so the
+    database must only scan ASCII input, for which it agrees with the re
+    patterns; everything else goes to re. re's whitespace class on str
+    also covers the ASCII separators 0x1c-0x1f, so it is widened here.
+    
+    Pattern ids are their list indices. Returns None when Hyperscan is not
+    installed or rejects a pattern, so callers fall back to the re scan.
+    """
+    if hyperscan is None:
+        return None
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[pattern.replace(r'\s', r'[\t-\r\x1c- ]').encode() for pattern in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(patterns)
+        )
+        return database
+    except Exception as e:
+        logger.warning(f"Hyperscan unavailable, using re for pattern scans: {str(e)}")
+        return None
+
+
 class RiskLevel(str, Enum):
     """Risk level classification"""
     LOW = "LOW"
@@ -53,6 +105,44 @@ class PromptSecurityValidator:
         r'insert\s+into',
     ]
     
+    # Only allow HTTPS or SSH git URLs
+    REPOSITORY_URL_PATTERNS = [
+        r'^https://github\.com/[\w\-\.]+/[\w\-\.]+\.git$',
+        r'^https://gitlab\.com/[\w\-\.]+/[\w\-\.]+\.git$',
+        r'^https://bitbucket\.org/[\w\-\.]+/[\w\-\.]+\.git$',
+        r'^git@github\.com:[\w\-\.]+/[\w\-\.]+\.git$',
+        r'^git@gitlab\.com:[\w\-\.]+/[\w\-\.]+\.git$',
+    ]
+    
+    # Pattern lists compiled once into single-pass alternations
+    _BLOCKED_RE = _compile_alternation(BLOCKED_PATTERNS, re.IGNORECASE)
+    _SQL_INJECTION_RE = _compile_alternation(SQL_INJECTION_PATTERNS, re.IGNORECASE)
+    _REPOSITORY_URL_RE = _compile_alternation(REPOSITORY_URL_PATTERNS)
+    _INVALID_PATH_CHARS_RE = re.compile(r'[<>:"|?*]')
+    
+    # Both input pattern lists in one Hyperscan database (SQL ids follow the
+    # blocked ids); None when Hyperscan is unavailable
+    _INPUT_SCAN_DB = _compile_hyperscan(BLOCKED_PATTERNS + SQL_INJECTION_PATTERNS)
+    
+    @staticmethod
+    def _scan_input(user_input: str) -> Set[int]:
+        """
+        Find which input patterns match, in one Hyperscan pass
+        
+        Args:
+            user_input: User-provided ASCII input string
+            
+        Returns:
+            Indices into BLOCKED_PATTERNS + SQL_INJECTION_PATTERNS that matched
+        """
+        matched = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            matched.add(pattern_id)
+        
+        PromptSecurityValidator._INPUT_SCAN_DB.scan(user_input.encode(), match_event_handler=on_match)
+        return matched
+    
     @staticmethod
     def sanitize_input(user_input: str, max_length: int = 1000) -> str:
         """
@@ -75,17 +165,33 @@ class PromptSecurityValidator:
         if len(user_input) > max_length:
             raise ValueError(f"Input exceeds maximum length of {max_length} characters")
         
+        validator = PromptSecurityValidator
+        # Hyperscan only agrees with re on ASCII input (see _compile_hyperscan)
+        if validator._INPUT_SCAN_DB is not None and user_input.isascii():
+            matched = validator._scan_input(user_input)
+            if matched:
+                n_blocked = len(validator.BLOCKED_PATTERNS)
+                pattern_id = min(matched)
+                if pattern_id < n_blocked:
+                    logger.warning(f"Blocked pattern detected in input: {validator.BLOCKED_PATTERNS[pattern_id]}")
+                    raise ValueError("Malicious input pattern detected")
+                logger.warning(f"SQL injection pattern detected: {validator.SQL_INJECTION_PATTERNS[pattern_id - n_blocked]}")
+                raise ValueError("Suspicious SQL pattern detected")
+            return user_input.strip()
+        
         # Check for blocked patterns
-        for pattern in PromptSecurityValidator.BLOCKED_PATTERNS:
-            if re.search(pattern, user_input, re.IGNORECASE):
-                logger.warning(f"Blocked pattern detected in input: {pattern}")
-                raise ValueError("Malicious input pattern detected")
+        match = PromptSecurityValidator._BLOCKED_RE.search(user_input)
+        if match:
+            pattern = PromptSecurityValidator.BLOCKED_PATTERNS[int(match.lastgroup[1:])]
+            logger.warning(f"Blocked pattern detected in input: {pattern}")
+            raise ValueError("Malicious input pattern detected")
         
         # Check for SQL injection patterns
-        for pattern in PromptSecurityValidator.SQL_INJECTION_PATTERNS:
-            if re.search(pattern, user_input, re.IGNORECASE):
-                logger.warning(f"SQL injection pattern detected: {pattern}")
-                raise ValueError("Suspicious SQL pattern detected")
+        match = PromptSecurityValidator._SQL_INJECTION_RE.search(user_input)
+        if match:
+            pattern = PromptSecurityValidator.SQL_INJECTION_PATTERNS[int(match.lastgroup[1:])]
+            logger.warning(f"SQL injection pattern detected: {pattern}")
+            raise ValueError("Suspicious SQL pattern detected")
         
         return user_input.strip()
     
@@ -103,16 +209,7 @@ class PromptSecurityValidator:
         Raises:
             ValueError: If URL is invalid
         """
-        # Only allow HTTPS or SSH git URLs
-        valid_patterns = [
-            r'^https://github\.com/[\w\-\.]+/[\w\-\.]+\.git$',
-            r'^https://gitlab\.com/[\w\-\.]+/[\w\-\.]+\.git$',
-            r'^https://bitbucket\.org/[\w\-\.]+/[\w\-\.]+\.git$',
-            r'^git@github\.com:[\w\-\.]+/[\w\-\.]+\.git$',
-            r'^git@gitlab\.com:[\w\-\.]+/[\w\-\.]+\.git$',
-        ]
-        
-        if not any(re.match(pattern, url) for pattern in valid_patterns):
+        if not PromptSecurityValidator._REPOSITORY_URL_RE.match(url):
             raise ValueError("Invalid repository URL. Only GitHub, GitLab, and Bitbucket are supported.")
         
         return url
@@ -136,7 +233,7 @@ class PromptSecurityValidator:
             raise ValueError("Invalid file path")
         
         # Reject suspicious patterns
-        if re.search(r'[<>:"|?*]', file_path):
+        if PromptSecurityValidator._INVALID_PATH_CHARS_RE.search(file_path):
             raise ValueError("File path contains invalid characters")
         
         return file_path
@@ -197,6 +294,9 @@ class RateLimitExceeded(Exception):
 class RateLimiter:
     """Simple rate limiter based on IP address"""
     
+    # Drop idle clients from the history every this many checks
+    EVICTION_INTERVAL = 10000
+    
     def __init__(self, requests_per_minute: int = 60, requests_per_hour: int = 500):
         """
         Initialize rate limiter
@@ -207,7 +307,30 @@ class RateLimiter:
         """
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
-        self.request_history: Dict[str, list] = {}
+        # Per-client request timestamps, oldest first, for the hour and minute windows
+        self.request_history: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.requests_per_hour))
+        self.minute_history: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.requests_per_minute))
+        self._checks = 0
+    
+    def _expire(self, client_ip: str, current_time: float):
+        """Pop timestamps that have left the hour and minute windows"""
+        hour_window = self.request_history.get(client_ip)
+        if hour_window is not None:
+            while hour_window and current_time - hour_window[0] >= 3600:
+                hour_window.popleft()
+        
+        minute_window = self.minute_history.get(client_ip)
+        if minute_window is not None:
+            while minute_window and current_time - minute_window[0] >= 60:
+                minute_window.popleft()
+    
+    def _evict_idle_clients(self, current_time: float):
+        """Remove clients without requests in the last hour"""
+        for client_ip in list(self.request_history):
+            self._expire(client_ip, current_time)
+            if not self.request_history[client_ip]:
+                del self.request_history[client_ip]
+                self.minute_history.pop(client_ip, None)
     
     def check_rate_limit(self, client_ip: str) -> bool:
         """
@@ -219,43 +342,35 @@ class RateLimiter:
         Returns:
             True if within limits, False if exceeded
         """
-        import time
-        
         current_time = time.time()
         
-        if client_ip not in self.request_history:
-            self.request_history[client_ip] = []
+        self._checks += 1
+        if self._checks % self.EVICTION_INTERVAL == 0:
+            self._evict_idle_clients(current_time)
         
-        # Remove old entries (older than 1 hour)
-        self.request_history[client_ip] = [
-            req_time for req_time in self.request_history[client_ip]
-            if current_time - req_time < 3600
-        ]
+        # Remove old entries (older than 1 hour / 1 minute)
+        self._expire(client_ip, current_time)
+        hour_window = self.request_history[client_ip]
+        minute_window = self.minute_history[client_ip]
         
         # Check rate limits
-        requests_last_minute = len([
-            req_time for req_time in self.request_history[client_ip]
-            if current_time - req_time < 60
-        ])
+        requests_last_minute = len(minute_window)
         
         if requests_last_minute >= self.requests_per_minute:
             logger.warning(f"Rate limit exceeded for IP {client_ip}: {requests_last_minute} requests/min")
             return False
         
-        if len(self.request_history[client_ip]) >= self.requests_per_hour:
+        if len(hour_window) >= self.requests_per_hour:
             logger.warning(f"Hourly rate limit exceeded for IP {client_ip}")
             return False
         
         # Record this request
-        self.request_history[client_ip].append(current_time)
+        hour_window.append(current_time)
+        minute_window.append(current_time)
         return True
     
     def get_remaining_requests(self, client_ip: str) -> Dict[str, int]:
         """Get remaining requests for client"""
-        import time
-        
-        current_time = time.time()
-        
         if client_ip not in self.request_history:
             return {
                 "remaining_per_minute": self.requests_per_minute,
@@ -263,22 +378,101 @@ class RateLimiter:
             }
         
         # Remove old entries
-        self.request_history[client_ip] = [
-            req_time for req_time in self.request_history[client_ip]
-            if current_time - req_time < 3600
-        ]
-        
-        requests_last_minute = len([
-            req_time for req_time in self.request_history[client_ip]
-            if current_time - req_time < 60
-        ])
+        self._expire(client_ip, time.time())
         
         return {
-            "remaining_per_minute": max(0, self.requests_per_minute - requests_last_minute),
+            "remaining_per_minute": max(0, self.requests_per_minute - len(self.minute_history[client_ip])),
             "remaining_per_hour": max(0, self.requests_per_hour - len(self.request_history[client_ip]))
         }
 
 
+class RedisRateLimiter(RateLimiter):
+    """
+    Rate limiter shared by all workers through Redis
+    
+    Keeps a fixed-window counter per client for the minute and the hour,
+    checked and incremented atomically by one Lua script (one round-trip
+    per request). Rejected requests are not counted. If Redis is
+    unreachable, the in-process limiter is used instead.
+    
+    Unlike the sliding windows of RateLimiter, a window starts with the
+    client's first request and resets when its key expires, so a burst at
+    the end of one window followed by one at the start of the next lets
+    through up to twice the limit within a minute (or hour).
+    """
+    
+    CHECK_SCRIPT = """
+    local minute = tonumber(redis.call('GET', KEYS[1]) or '0')
+    local hour = tonumber(redis.call('GET', KEYS[2]) or '0')
+    if minute >= tonumber(ARGV[1]) or hour >= tonumber(ARGV[2]) then
+        return {minute, hour, 0}
+    end
+    minute = redis.call('INCR', KEYS[1])
+    if minute == 1 then redis.call('EXPIRE', KEYS[1], 60) end
+    hour = redis.call('INCR', KEYS[2])
+    if hour == 1 then redis.call('EXPIRE', KEYS[2], 3600) end
+    return {minute, hour, 1}
+    """
+    
+    def __init__(self, redis_url: str, requests_per_minute: int = 60, requests_per_hour: int = 500):
+        """
+        Initialize rate limiter
+        
+        Args:
+            redis_url: Redis connection URL
+            requests_per_minute: Max requests per minute
+            requests_per_hour: Max requests per hour
+        """
+        super().__init__(requests_per_minute, requests_per_hour)
+        self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+        self._check_script = self.redis.register_script(self.CHECK_SCRIPT)
+    
+    @staticmethod
+    def _keys(client_ip: str) -> List[str]:
+        """Redis keys of the minute and hour counters"""
+        return [f"rl:{client_ip}:m", f"rl:{client_ip}:h"]
+    
+    def check_rate_limit(self, client_ip: str) -> bool:
+        """
+        Check if client has exceeded rate limit
+        
+        Args:
+            client_ip: Client IP address
+            
+        Returns:
+            True if within limits, False if exceeded
+        """
+        try:
+            requests_last_minute, requests_last_hour, allowed = self._check_script(
+                keys=self._keys(client_ip),
+                args=[self.requests_per_minute, self.requests_per_hour]
+            )
+        except redis.RedisError as e:
+            logger.error(f"Redis rate limit check failed, using local limiter: {str(e)}")
+            return super().check_rate_limit(client_ip)
+        
+        if not allowed:
+            if requests_last_minute >= self.requests_per_minute:
+                logger.warning(f"Rate limit exceeded for IP {client_ip}: {requests_last_minute} requests/min")
+            else:
+                logger.warning(f"Hourly rate limit exceeded for IP {client_ip}")
+            return False
+        return True
+    
+    def get_remaining_requests(self, client_ip: str) -> Dict[str, int]:
+        """Get remaining requests for client"""
+        try:
+            minute, hour = self.redis.mget(self._keys(client_ip))
+        except redis.RedisError as e:
+            logger.error(f"Redis rate limit lookup failed, using local limiter: {str(e)}")
+            return super().get_remaining_requests(client_ip)
+        
+        return {
+            "remaining_per_minute": max(0, self.requests_per_minute - int(minute or 0)),
+            "remaining_per_hour": max(0, self.requests_per_hour - int(hour or 0))
+        }
+
+
 class DataEncryption:
     """Basic encryption utilities for sensitive data"""
     
@@ -296,25 +490,32 @@ class DataEncryption:
         if len(api_key) <= 8:
             return "*" * len(api_key)
         
-        visible_chars = 4
-        return api_key[:visible_chars] + "*" * (len(api_key) - 2 * visible_chars) + api_key[-visible_chars:]
+        return f"{api_key[:4]}{'*' * (len(api_key) - 8)}{api_key[-4:]}"
     
     @staticmethod
     def mask_email(email: str) -> str:
         """Mask email for logging"""
-        if "@" not in email:
+        at = email.find("@")
+        if at < 0:
             return "***"
         
-        local, domain = email.split("@")
-        masked_local = local[0] + "*" * (len(local) - 2) + local[-1] if len(local) > 2 else "*" * len(local)
-        return f"{masked_local}@{domain}"
+        if at > 2:
+            return f"{email[0]}{'*' * (at - 2)}{email[at - 1:]}"
+        return f"{'*' * at}{email[at:]}"
 
 
-# Global rate limiter instance
-_rate_limiter = RateLimiter(
-    requests_per_minute=100,
-    requests_per_hour=500
-)
+# Global rate limiter instance, shared across workers through Redis when configured
+if redis is not None and os.getenv("REDIS_URL"):
+    _rate_limiter = RedisRateLimiter(
+        os.getenv("REDIS_URL"),
+        requests_per_minute=100,
+        requests_per_hour=500
+    )
+else:
+    _rate_limiter = RateLimiter(
+        requests_per_minute=100,
+        requests_per_hour=500
+    )
 
 
 def get_rate_limiter() -> RateLimiter:
@@ -3,16 +3,43 @@ Impact Analyzer Service - Main Application
 Performs graph analysis and impact calculation
 """
 import os
+import re
+import asyncio
+import multiprocessing
+import heapq
+import hashlib
 import logging
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Dict, Optional, Any, Set, Tuple, Union
 from datetime import datetime
 import networkx as nx
-import json
+import numpy as np
+import orjson
+from numba import njit, prange
+from scipy.sparse import csgraph
+
+try:
+    import networkit as nk
+except ImportError:  # Optional; NetworkX computes the centralities without it
+    nk = None
+
+try:
+    import redis
+except ImportError:  # Optional; centralities are then only cached per process
+    redis = None
 
 logger = logging.getLogger(__name__)
 
+# Dispatch graph algorithms to the nx-cugraph GPU backend when enabled
+USE_GPU_BACKEND = os.getenv("USE_GPU_BACKEND", "false").lower() == "true"
+_NX_BACKEND = {"backend": "cugraph"} if USE_GPU_BACKEND else {}
+
 # Configure logging
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO"),
@@ -23,14 +50,255 @@ logging.basicConfig(
 app = FastAPI(
     title="Impact Analyzer Service",
     description="Graph-based impact analysis and criticality scoring",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# File-type keywords for recommendations; the lookahead reports overlapping
+# matches too, so one scan finds every keyword a plain substring test would
+_FILE_TYPE_KEYWORDS_RE = re.compile(r'(?=(database|api|auth|security))')
+
+# Service name of "services/<name>/..." component paths
+_SERVICE_RE = re.compile(r'services/([^/]*)')
+
+# Fixed recommendations by risk level, and by keywords found in changed file paths
+_RISK_RECOMMENDATIONS = {
+    "CRITICAL": (
+        "URGENT: Extensive impact detected. Recommend staged rollout with feature flags",
+        "Implement enhanced monitoring and alerting",
+        "Consider rolling back plan if issues detected",
+    ),
+    "HIGH": (
+        "High impact detected. Plan comprehensive testing",
+        "Deploy with caution, monitor all affected endpoints",
+    ),
+    "MEDIUM": (
+        "Standard testing procedures recommended",
+    ),
+}
+_FILE_TYPE_RECOMMENDATIONS = (
+    (frozenset({"database"}), "Database schema changes detected. Verify migration strategy"),
+    (frozenset({"api"}), "API changes detected. Verify backward compatibility"),
+    (frozenset({"auth", "security"}), "Security-related changes. Perform security review"),
+)
+
+# Graph endpoints read node-link JSON straight from the body with orjson;
+# this documents the body they expect
+_GRAPH_BODY_DOC = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"type": "object", "title": "Graph Data"}}}
+    }
+}
+
+
+async def _read_json(request: Request) -> Any:
+    """
+    Parse a JSON request body with orjson
+    
+    Args:
+        request: Incoming request
+        
+    Returns:
+        Parsed JSON value
+        
+    Raises:
+        HTTPException: If the body is not valid JSON
+    """
+    try:
+        return orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
+
+
+def _networkit_centralities(
+    graph: nx.DiGraph,
+    sample_k: Optional[int] = None
+) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Compute betweenness and closeness centrality with NetworKit's C++ kernels
+    
+    Scores match nx.betweenness_centrality and nx.closeness_centrality.
+    NetworkX closeness uses incoming distances on directed graphs, so
+    closeness is computed on the reversed graph. nx2nk numbers nodes in
+    graph.nodes() order, which maps scores back to node ids.
+    
+    Args:
+        graph: NetworkX graph
+        sample_k: Number of sampled sources for estimated betweenness,
+            or None for exact betweenness
+        
+    Returns:
+        Tuple of (betweenness by node, closeness by node)
+    """
+    nodes = list(graph.nodes())
+    nk_graph = nk.nxadapter.nx2nk(graph)
+    reversed_graph = nk.nxadapter.nx2nk(graph.reverse(copy=False)) if graph.is_directed() else nk_graph
+    
+    if sample_k:
+        betweenness = nk.centrality.EstimateBetweenness(nk_graph, sample_k, True, True).run().scores()
+    else:
+        betweenness = nk.centrality.Betweenness(nk_graph, normalized=True).run().scores()
+    closeness = nk.centrality.Closeness(
+        reversed_graph, True, nk.centrality.ClosenessVariant.Generalized
+    ).run().scores()
+    
+    return dict(zip(nodes, betweenness)), dict(zip(nodes, closeness))
+
+
+def _node_link_graph(data: Dict[str, Any]) -> nx.DiGraph:
+    """
+    Build a graph from node-link data, writing the adjacency dicts directly
+    
+    Produces the same graph as nx.node_link_graph for directed, non-multi
+    graphs (the scanner's format) without add_node/add_edge call overhead
+    per element. Other graphs, and node ids given as lists (which NetworkX
+    turns into tuples), go through nx.node_link_graph.
+    
+    Args:
+        data: Graph in node-link JSON format
+        
+    Returns:
+        NetworkX graph
+    """
+    if not data.get("directed", False) or data.get("multigraph", True):
+        return nx.node_link_graph(data)
+    
+    graph = nx.DiGraph()
+    graph.graph = data.get("graph", {})
+    node_attrs, succ, pred = graph._node, graph._succ, graph._pred
+    
+    for position, d in enumerate(data["nodes"]):
+        node = d.get("id", position)
+        if isinstance(node, list):
+            return nx.node_link_graph(data)
+        attrs = {k: v for k, v in d.items() if k != "id"}
+        if node in succ:
+            node_attrs[node].update(attrs)
+        else:
+            node_attrs[node] = attrs
+            succ[node] = {}
+            pred[node] = {}
+    
+    for d in data["links"]:
+        u, v = d["source"], d["target"]
+        if isinstance(u, list) or isinstance(v, list):
+            return nx.node_link_graph(data)
+        for node in (u, v):
+            if node not in succ:
+                node_attrs[node] = {}
+                succ[node] = {}
+                pred[node] = {}
+        edge_attrs = succ[u].get(v)
+        if edge_attrs is None:
+            edge_attrs = succ[u][v] = pred[v][u] = {}
+        edge_attrs.update((k, val) for k, val in d.items() if k != "source" and k != "target")
+    
+    return graph
+
+
+def _to_csr(graph: nx.DiGraph) -> Tuple[Any, List[str]]:
+    """
+    Convert a graph to an unweighted CSR adjacency matrix
+    
+    Args:
+        graph: Non-empty NetworkX graph
+        
+    Returns:
+        Tuple of (CSR matrix, node ids in row order)
+    """
+    nodes = list(graph.nodes())
+    return nx.to_scipy_sparse_array(graph, nodelist=nodes, weight=None, format='csr'), nodes
+
+
+# Explicit signature: compiled (or loaded from the on-disk cache the image
+# build writes) at import rather than on the first request. The cache is only
+# valid for the module name it was written under (src.main in the image)
+@njit("float64[:](float64[:], float64[:], float64[:], float64[:], float64)", parallel=True, cache=True)
+def _criticality_kernel(in_degree, out_degree, betweenness, closeness, max_degree):
+    """
+    Weighted criticality score for each node, clamped to [0, 1]
+    
+    Same weights and evaluation order as calculate_criticality, so the
+    scores are identical.
+    
+    Args:
+        in_degree: In-degree per node (float64)
+        out_degree: Out-degree per node (float64)
+        betweenness: Betweenness centrality per node (float64)
+        closeness: Closeness centrality per node (float64)
+        max_degree: Maximum node degree in the graph
+        
+    Returns:
+        Criticality score per node
+    """
+    scores = np.empty_like(betweenness)
+    for i in prange(scores.shape[0]):
+        score = (
+            in_degree[i] / max_degree * 0.4 +
+            out_degree[i] / max_degree * 0.2 +
+            betweenness[i] * 0.3 +
+            closeness[i] * 0.1
+        )
+        scores[i] = min(1.0, max(0.0, score))
+    return scores
+
+
+def _compute_graph_stats(graph: nx.DiGraph, degrees: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Compute summary statistics of a graph
+    
+    Args:
+        graph: NetworkX directed graph
+        degrees: Degree by node (see ImpactAnalyzer.degree_stats)
+        
+    Returns:
+        Statistics dict (without timestamp)
+    """
+    node_count = len(degrees)
+    edge_count = graph.number_of_edges()
+    
+    # Weak components in one pass over the CSR arrays
+    number_of_components = 0
+    if node_count > 0:
+        csr, _ = _to_csr(graph)
+        number_of_components = csgraph.connected_components(
+            csr, directed=True, connection='weak', return_labels=False
+        )
+    
+    stats = {
+        "node_count": node_count,
+        "edge_count": edge_count,
+        "density": nx.density(graph),
+        "is_dag": nx.is_directed_acyclic_graph(graph),
+        "is_connected": number_of_components == 1,
+        "number_of_components": int(number_of_components),
+        "average_degree": 2 * edge_count / max(1, node_count)
+    }
+    
+    if node_count > 0:
+        # Find most central nodes; degree centrality is degree / (n - 1),
+        # and 1 for a single node as in nx.degree_centrality
+        top_nodes = heapq.nlargest(5, degrees.items(), key=lambda x: x[1])
+        if node_count > 1:
+            scale = 1.0 / (node_count - 1.0)
+            stats["top_central_nodes"] = [{"node": n, "centrality": d * scale} for n, d in top_nodes]
+        else:
+            stats["top_central_nodes"] = [{"node": n, "centrality": 1} for n, _ in top_nodes]
+    
+    return stats
+
 
 # Request/Response Models
 class AnalyzeImpactRequest(BaseModel):
     changed_files: List[str] = Field(..., description="List of changed files")
     graph_data: Dict[str, Any] = Field(..., description="Dependency graph as node-link format")
+    sampling_k: Optional[int] = Field(None, description="Sampled sources for betweenness (0 for exact)")
+    subgraph_centrality: bool = Field(
+        False,
+        description="Score against the impacted subgraph instead of the whole graph when it has at most "
+                    "SUBGRAPH_CENTRALITY_MAX_NODES nodes; centralities are then relative to the impact set"
+    )
 
 
 class ImpactAnalysisResult(BaseModel):
@@ -50,59 +318,162 @@ class HealthResponse(BaseModel):
     timestamp: str
 
 
+def _copy_analysis(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy an impact analysis result down to its lists and dicts
+    
+    Their items are strings and floats, and impacted_set is a frozenset, so
+    this is as good as a deep copy at the cost of a shallow one per field.
+    
+    Args:
+        result: Result of ImpactAnalyzer.analyze_impact
+        
+    Returns:
+        Result sharing no mutable container with the original
+    """
+    copied = dict(result)
+    for field, value in result.items():
+        if isinstance(value, list):
+            copied[field] = list(value)
+        elif isinstance(value, dict):
+            copied[field] = dict(value)
+    return copied
+
+
 class ImpactAnalyzer:
     """Analyzes code change impacts using graph algorithms"""
     
     def __init__(self):
-        pass
+        # Betweenness is estimated from this many sampled sources on larger graphs
+        self.betweenness_sample_k = int(os.getenv("BETWEENNESS_SAMPLE_K", "500"))
+        # Reconstructed graphs by content hash, most recently used last
+        self._graph_cache: "OrderedDict[str, nx.DiGraph]" = OrderedDict()
+        self._graph_cache_size = int(os.getenv("GRAPH_CACHE_SIZE", "32"))
+        # Impact sets up to this size can be scored on their induced subgraph
+        self.subgraph_max_nodes = int(os.getenv("SUBGRAPH_CENTRALITY_MAX_NODES", "500"))
+        # Derived results (centralities, stats) for cached graphs only; entries
+        # go away with their graph once it is evicted
+        self._graph_memo: "weakref.WeakKeyDictionary[nx.DiGraph, Dict]" = weakref.WeakKeyDictionary()
+        # Impact sets and analyses remembered per cached graph, most recently used last
+        self._impact_memo_size = int(os.getenv("IMPACT_MEMO_SIZE", "256"))
+        # Centralities shared between workers and replicas through Redis
+        self._shared_cache = None
+        self._shared_cache_ttl = int(os.getenv("CENTRALITY_CACHE_TTL", "86400"))
+        redis_url = os.getenv("REDIS_URL")
+        if redis is not None and redis_url:
+            self._shared_cache = redis.Redis.from_url(redis_url, socket_timeout=1)
     
-    def analyze_impact(self, changed_files: List[str], graph_data: Dict) -> Dict[str, Any]:
+    def load_graph(self, graph_data: Union[Dict, nx.DiGraph]) -> nx.DiGraph:
+        """
+        Reconstruct a graph from node-link data, reusing an identical earlier one
+        
+        Graphs are keyed by a hash of their canonical JSON, so repeat requests
+        for the same graph skip reconstruction and reuse the centralities and
+        stats already computed for it. Cached graphs are shared between
+        requests and must not be modified. In-process callers may pass a
+        graph directly, which is used as is.
+        
+        Args:
+            graph_data: NetworkX graph in node-link JSON format, or the graph itself
+            
+        Returns:
+            NetworkX graph
+        """
+        if isinstance(graph_data, nx.Graph):
+            return graph_data
+        
+        key = hashlib.blake2b(
+            orjson.dumps(graph_data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS),
+            digest_size=16
+        ).hexdigest()
+        
+        graph = self._graph_cache.get(key)
+        if graph is not None:
+            self._graph_cache.move_to_end(key)
+            return graph
+        
+        graph = _node_link_graph(graph_data)
+        if self._graph_cache_size > 0:
+            self._graph_cache[key] = graph
+            self._graph_memo[graph] = {}
+            if len(self._graph_cache) > self._graph_cache_size:
+                self._graph_cache.popitem(last=False)
+        return graph
+    
+    def graph_memo(self, graph: nx.DiGraph) -> Optional[Dict]:
+        """
+        Get the derived-results memo of a graph, or None if it may still change
+        
+        Cached graphs and graphs frozen with nx.freeze cannot change, so
+        results derived from them can be reused.
+        """
+        memo = self._graph_memo.get(graph)
+        if memo is None and nx.is_frozen(graph):
+            memo = self._graph_memo[graph] = {}
+        return memo
+    
+    def analyze_impact(
+        self,
+        changed_files: List[str],
+        graph_data: Union[Dict, nx.DiGraph],
+        sampling_k: Optional[int] = None,
+        subgraph_centrality: bool = False
+    ) -> Dict[str, Any]:
         """
         Analyze impact of changed files on the codebase
         
         Args:
             changed_files: List of files that were changed
-            graph_data: NetworkX graph in node-link JSON format
+            graph_data: NetworkX graph in node-link JSON format, or the graph
+                itself (see load_graph)
+            sampling_k: Sampled sources for betweenness (see compute_graph_metrics)
+            subgraph_centrality: Score small impact sets on their induced
+                subgraph (see score_impact_subgraph)
             
         Returns:
-            Impact analysis results
+            Impact analysis results; impacted_set holds impacted_components
+            as a frozenset for in-process callers
         """
         try:
             # Reconstruct graph from JSON
-            graph = nx.node_link_graph(graph_data)
+            graph = self.load_graph(graph_data)
             
-            impacted_nodes = set(changed_files)
+            # Repeated analyses of an unchanging graph return the earlier result
+            memo = self.graph_memo(graph)
+            analyses = None
+            key = (tuple(changed_files), sampling_k, subgraph_centrality)
+            if memo is not None and self._impact_memo_size > 0:
+                analyses = memo.setdefault("analyses", OrderedDict())
+                if key in analyses:
+                    analyses.move_to_end(key)
+                    return _copy_analysis(analyses[key])
             
-            # Find descendants (forward impact)
-            for file in changed_files:
-                if file in graph:
-                    descendants = nx.descendants(graph, file)
-                    impacted_nodes.update(descendants)
+            sources = [file for file in changed_files if file in graph]
             
-            # Find ancestors (reverse impact)
-            for file in changed_files:
-                if file in graph:
-                    ancestors = nx.ancestors(graph, file)
-                    impacted_nodes.update(ancestors)
+            # Find descendants (forward impact) and ancestors (reverse impact)
+            impacted_nodes = set(changed_files)
+            impacted_nodes.update(self.impacted_nodes(graph, sources))
             
-            # Calculate criticality scores
-            criticality_scores = {}
-            for node in impacted_nodes:
-                if node not in changed_files:  # Don't score the changed files themselves
-                    score = self.calculate_criticality(node, graph)
-                    criticality_scores[node] = score
+            # Calculate criticality scores; don't score the changed files themselves
+            changed = set(changed_files)
+            score_targets = [node for node in impacted_nodes if node not in changed]
+            if subgraph_centrality and len(impacted_nodes) <= self.subgraph_max_nodes:
+                criticality_scores = self.score_impact_subgraph(graph, impacted_nodes, score_targets)
+            else:
+                criticality_scores = self.score_nodes(graph, score_targets, sampling_k)
             
-            # Identify high-risk areas
-            high_risk_areas = [
-                node for node, score in criticality_scores.items() if score > 0.7
-            ]
+            # Identify high-risk areas with one mask and one max over the scores
+            scored_nodes = np.array(list(criticality_scores.keys()), dtype=object)
+            scores = np.fromiter(criticality_scores.values(), dtype=np.float64, count=len(criticality_scores))
+            high_risk_areas = scored_nodes[scores > 0.7].tolist()
+            max_score = scores.max() if scores.size else 0.0
             
             # Determine risk level
             if len(high_risk_areas) >= 5:
                 risk_level = "CRITICAL"
-            elif len(high_risk_areas) >= 3 or max(criticality_scores.values()) > 0.85:
+            elif len(high_risk_areas) >= 3 or max_score > 0.85:
                 risk_level = "HIGH"
-            elif len(high_risk_areas) >= 1 or max(criticality_scores.values()) > 0.65:
+            elif len(high_risk_areas) >= 1 or max_score > 0.65:
                 risk_level = "MEDIUM"
             else:
                 risk_level = "LOW"
@@ -118,9 +489,12 @@ class ImpactAnalyzer:
                 changed_files
             )
             
-            return {
+            impacted_set = frozenset(impacted_nodes)
+            result = {
                 "changed_files": changed_files,
-                "impacted_components": list(impacted_nodes),
+                "impacted_components": list(impacted_set),
+                # For in-process membership checks; not part of the JSON response
+                "impacted_set": impacted_set,
                 "impacted_count": len(impacted_nodes),
                 "criticality_scores": criticality_scores,
                 "high_risk_areas": high_risk_areas,
@@ -128,71 +502,407 @@ class ImpactAnalyzer:
                 "affected_services": affected_services,
                 "recommendations": recommendations
             }
+            if analyses is not None:
+                # The memo keeps its own copy so callers may mutate what they get
+                analyses[key] = _copy_analysis(result)
+                if len(analyses) > self._impact_memo_size:
+                    analyses.popitem(last=False)
+            return result
             
         except Exception as e:
             logger.error(f"Error analyzing impact: {str(e)}")
             raise
     
-    def calculate_criticality(self, node: str, graph: nx.DiGraph) -> float:
+    def impacted_nodes(self, graph: nx.DiGraph, sources: List[str]) -> frozenset:
         """
-        Calculate criticality score for a node
+        Get the impact set of some sources, reusing it for repeated queries
+        
+        Impact sets of cached graphs are remembered per source set, so a
+        repeated query returns the earlier result instead of traversing the
+        graph again.
         
         Args:
-            node: Node identifier
             graph: NetworkX directed graph
+            sources: Start nodes, all present in the graph
             
         Returns:
-            Criticality score (0-1)
+            Sources plus every node reachable from them in either direction
         """
-        try:
-            # Get node degree metrics
-            in_degree = graph.in_degree(node)
-            out_degree = graph.out_degree(node)
+        memo = self.graph_memo(graph)
+        if memo is None or self._impact_memo_size <= 0:
+            return frozenset(self._impacted_nodes(graph, sources))
+        
+        impact_sets = memo.setdefault("impacted", OrderedDict())
+        key = frozenset(sources)
+        impacted = impact_sets.get(key)
+        if impacted is not None:
+            impact_sets.move_to_end(key)
+            return impacted
+        
+        impacted = impact_sets[key] = frozenset(self._impacted_nodes(graph, sources))
+        if len(impact_sets) > self._impact_memo_size:
+            impact_sets.popitem(last=False)
+        return impacted
+    
+    @staticmethod
+    def _impacted_nodes(graph: nx.DiGraph, sources: List[str]) -> set:
+        """
+        Descendants and ancestors of all sources in one fused traversal
+        
+        Forward (successor) and backward (predecessor) frontiers advance
+        together, one level per iteration, so both directions share a single
+        loop instead of a separate search per changed file and direction.
+        Each direction keeps its own visited set: a node already reached
+        going forward may still have to be expanded going backward, since
+        on a cycle it is both a descendant and an ancestor.
+        
+        Args:
+            graph: NetworkX directed graph
+            sources: Start nodes, all present in the graph
             
-            # Normalize by max degree
-            max_degree = max(1, max(dict(graph.degree()).values()) if graph.degree() else 1)
-            normalized_in_degree = in_degree / max_degree
-            normalized_out_degree = out_degree / max_degree
+        Returns:
+            Sources plus every node reachable from them in either direction
+        """
+        succ, pred = graph._succ, graph._pred
+        downstream = set(sources)
+        upstream = set(sources)
+        forward = list(downstream)
+        backward = list(upstream)
+        
+        while forward or backward:
+            next_forward = []
+            for u in forward:
+                for v in succ[u]:
+                    if v not in downstream:
+                        downstream.add(v)
+                        next_forward.append(v)
             
-            # Calculate centrality metrics
-            try:
-                betweenness = nx.betweenness_centrality(graph).get(node, 0)
-            except:
-                betweenness = 0
+            next_backward = []
+            for u in backward:
+                for v in pred[u]:
+                    if v not in upstream:
+                        upstream.add(v)
+                        next_backward.append(v)
             
-            try:
-                closeness = nx.closeness_centrality(graph).get(node, 0)
-            except:
-                closeness = 0
+            forward, backward = next_forward, next_backward
+        
+        downstream |= upstream
+        return downstream
+    
+    def degree_stats(self, graph: nx.DiGraph) -> Tuple[Dict[str, int], int]:
+        """
+        Get node degrees and the maximum degree (at least 1) in one pass
+        
+        Args:
+            graph: NetworkX directed graph
             
-            # Weighted scoring
-            # Nodes that many modules depend on (high in_degree) = high criticality
-            # Nodes that depend on many modules (high out_degree) = medium criticality
-            # Nodes with high betweenness = bridges = high criticality
+        Returns:
+            Tuple of (degree by node, max degree)
+        """
+        memo = self.graph_memo(graph)
+        if memo is not None and "degrees" in memo:
+            return memo["degrees"]
+        
+        degrees = dict(graph.degree())
+        result = (degrees, max(1, max(degrees.values(), default=1)))
+        if memo is not None:
+            memo["degrees"] = result
+        return result
+    
+    def degree_arrays(self, graph: nx.DiGraph) -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+        """
+        Get in- and out-degree arrays of all nodes from the CSR adjacency
+        
+        Out-degrees are the CSR row lengths and in-degrees the column counts,
+        so scoring indexes arrays instead of querying a degree view per node.
+        
+        Args:
+            graph: NetworkX directed graph
             
-            criticality = (
-                normalized_in_degree * 0.4 +      # How many depend on this
-                normalized_out_degree * 0.2 +      # How many this depends on
-                betweenness * 0.3 +                # Bridge importance
-                closeness * 0.1                    # Proximity to other nodes
+        Returns:
+            Tuple of (array index by node, in-degrees, out-degrees) as float64
+        """
+        memo = self.graph_memo(graph)
+        if memo is not None and "degree_arrays" in memo:
+            return memo["degree_arrays"]
+        
+        if graph.number_of_nodes() == 0:
+            result = ({}, np.zeros(0), np.zeros(0))
+        else:
+            csr, nodes = _to_csr(graph)
+            result = (
+                {node: i for i, node in enumerate(nodes)},
+                np.bincount(csr.indices, minlength=len(nodes)).astype(np.float64),
+                np.diff(csr.indptr).astype(np.float64)
             )
+        if memo is not None:
+            memo["degree_arrays"] = result
+        return result
+    
+    def compute_graph_metrics(
+        self,
+        graph: nx.DiGraph,
+        sampling_k: Optional[int] = None
+    ) -> Tuple[Dict[str, float], Dict[str, float], int]:
+        """
+        Compute the whole-graph metrics used by calculate_criticality
+        
+        Centralities are computed for all nodes in one pass each, so scoring
+        many nodes reuses them instead of re-running them per node. On
+        graphs with more nodes than the sample size, betweenness is
+        estimated from sampled sources (O(k*m) instead of O(n*m)), which
+        keeps the criticality ranking while cutting most of the cost.
+        
+        Args:
+            graph: NetworkX directed graph
+            sampling_k: Sampled sources for betweenness; None uses
+                BETWEENNESS_SAMPLE_K and 0 forces exact betweenness
             
-            return min(1.0, max(0.0, criticality))
+        Returns:
+            Tuple of (betweenness by node, closeness by node, max degree)
+        """
+        _, max_degree = self.degree_stats(graph)
+        
+        sample_k = self.betweenness_sample_k if sampling_k is None else sampling_k
+        if not 0 < sample_k < graph.number_of_nodes():
+            sample_k = None
+        
+        memo = self.graph_memo(graph)
+        if memo is not None:
+            metrics = memo.get(("metrics", sample_k))
+            if metrics is None:
+                metrics = memo[("metrics", sample_k)] = self._shared_centralities(graph, sample_k)
+            betweenness, closeness = metrics
+        else:
+            betweenness, closeness = self._shared_centralities(graph, sample_k)
+        
+        return betweenness, closeness, max_degree
+    
+    def graph_fingerprint(self, graph: nx.DiGraph) -> str:
+        """
+        Hash a graph's structure, ignoring node and edge attributes
+        
+        Args:
+            graph: NetworkX directed graph
             
+        Returns:
+            Hex digest of the node order and adjacency
+        """
+        memo = self.graph_memo(graph)
+        if memo is not None and "fingerprint" in memo:
+            return memo["fingerprint"]
+        
+        fingerprint = hashlib.blake2b(
+            orjson.dumps([list(graph), [list(graph.adj[node]) for node in graph]]),
+            digest_size=16
+        ).hexdigest()
+        if memo is not None:
+            memo["fingerprint"] = fingerprint
+        return fingerprint
+    
+    def _shared_centralities(
+        self,
+        graph: nx.DiGraph,
+        sample_k: Optional[int]
+    ) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Get centralities from the shared Redis cache, computing and storing them on a miss
+        
+        Values are stored as arrays in node order under
+        centrality:<fingerprint>:<sample_k>, so a graph warmed by another
+        process or replica skips the Brandes pass here.
+        
+        Args:
+            graph: NetworkX directed graph
+            sample_k: Sampled sources for betweenness, or None for exact
+            
+        Returns:
+            Tuple of (betweenness by node, closeness by node)
+        """
+        if self._shared_cache is None:
+            return self._compute_centralities(graph, sample_k)
+        
+        key = f"centrality:{self.graph_fingerprint(graph)}:{sample_k or 0}"
+        try:
+            cached = self._shared_cache.get(key)
+            if cached is not None:
+                betweenness, closeness = orjson.loads(cached)
+                return dict(zip(graph, betweenness)), dict(zip(graph, closeness))
+        except Exception as e:
+            logger.warning(f"Error reading shared centrality cache: {str(e)}")
+        
+        betweenness, closeness = self._compute_centralities(graph, sample_k)
+        try:
+            self._shared_cache.setex(key, self._shared_cache_ttl, orjson.dumps([
+                [betweenness.get(node, 0) for node in graph],
+                [closeness.get(node, 0) for node in graph]
+            ]))
         except Exception as e:
-            logger.warning(f"Error calculating criticality for {node}: {str(e)}")
-            return 0.5  # Default to medium criticality on error
+            logger.warning(f"Error writing shared centrality cache: {str(e)}")
+        return betweenness, closeness
+    
+    def _compute_centralities(
+        self,
+        graph: nx.DiGraph,
+        sample_k: Optional[int]
+    ) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Compute betweenness and closeness with the best available backend
+        
+        Args:
+            graph: NetworkX directed graph
+            sample_k: Sampled sources for betweenness, or None for exact
+            
+        Returns:
+            Tuple of (betweenness by node, closeness by node)
+        """
+        if nk is not None and not USE_GPU_BACKEND and graph.number_of_nodes() > 2:
+            try:
+                return _networkit_centralities(graph, sample_k)
+            except Exception as e:
+                logger.warning(f"NetworKit centrality failed, using NetworkX: {str(e)}")
+        
+        if graph.number_of_nodes() == 0:
+            return {}, {}
+        
+        # compute_graph_metrics keeps sample_k below the node count
+        betweenness = nx.betweenness_centrality(graph, k=sample_k, seed=42, **_NX_BACKEND)
+        closeness = nx.closeness_centrality(graph, **_NX_BACKEND)
+        
+        return betweenness, closeness
+    
+    def score_nodes(
+        self,
+        graph: nx.DiGraph,
+        nodes: List[str],
+        sampling_k: Optional[int] = None
+    ) -> Dict[str, float]:
+        """
+        Calculate criticality scores for many nodes at once
+        
+        Graph metrics are computed once and the weighted scoring runs as a
+        compiled kernel over per-node arrays.
+        
+        Args:
+            graph: NetworkX directed graph
+            nodes: Nodes to score, all present in the graph
+            sampling_k: Sampled sources for betweenness (see compute_graph_metrics)
+            
+        Returns:
+            Criticality score (0-1) by node
+        """
+        betweenness, closeness, max_degree = self.compute_graph_metrics(graph, sampling_k)
+        index, in_degree, out_degree = self.degree_arrays(graph)
+        count = len(nodes)
+        positions = np.fromiter((index[node] for node in nodes), dtype=np.int64, count=count)
+        
+        scores = _criticality_kernel(
+            in_degree[positions],
+            out_degree[positions],
+            np.fromiter((betweenness.get(node, 0) for node in nodes), dtype=np.float64, count=count),
+            np.fromiter((closeness.get(node, 0) for node in nodes), dtype=np.float64, count=count),
+            float(max_degree)
+        )
+        return dict(zip(nodes, scores.tolist()))
+    
+    def score_impact_subgraph(
+        self,
+        graph: nx.DiGraph,
+        impacted_nodes: Set[str],
+        nodes: List[str]
+    ) -> Dict[str, float]:
+        """
+        Calculate criticality scores on the subgraph induced by an impact set
+        
+        Exact centralities on the small induced subgraph replace (sampled)
+        ones on the whole graph, so scores rank nodes relative to the impact
+        set rather than the codebase. Results are memoized on cached graphs
+        per impact set, apart from the whole-graph metrics.
+        
+        Args:
+            graph: NetworkX directed graph
+            impacted_nodes: Impact set; nodes missing from the graph are ignored
+            nodes: Nodes to score, all in the impact set and the graph
+            
+        Returns:
+            Criticality score (0-1) by node
+        """
+        key = frozenset(node for node in impacted_nodes if node in graph)
+        
+        memo = self.graph_memo(graph)
+        subgraph_scores = memo.setdefault("subgraph_scores", OrderedDict()) if memo is not None else None
+        scores = subgraph_scores.get(key) if subgraph_scores is not None else None
+        
+        if scores is None:
+            subgraph = graph.subgraph(key).copy()
+            scores = self.score_nodes(subgraph, list(subgraph), 0)
+            if subgraph_scores is not None:
+                subgraph_scores[key] = scores
+                if len(subgraph_scores) > self._graph_cache_size:
+                    subgraph_scores.popitem(last=False)
+        else:
+            subgraph_scores.move_to_end(key)
+        
+        return {node: scores[node] for node in nodes}
+    
+    def calculate_criticality(
+        self,
+        node: str,
+        graph: nx.DiGraph,
+        betweenness: Optional[Dict[str, float]] = None,
+        closeness: Optional[Dict[str, float]] = None,
+        max_degree: Optional[int] = None
+    ) -> float:
+        """
+        Calculate criticality score for a node
+        
+        Args:
+            node: Node identifier
+            graph: NetworkX directed graph
+            betweenness: Precomputed betweenness centrality by node
+            closeness: Precomputed closeness centrality by node
+            max_degree: Precomputed maximum node degree
+            
+        Returns:
+            Criticality score (0-1)
+        """
+        if node not in graph:
+            logger.warning(f"Cannot calculate criticality for {node}: not in graph")
+            return 0.5  # Default to medium criticality for unknown nodes
+        
+        if betweenness is None or closeness is None or max_degree is None:
+            betweenness, closeness, max_degree = self.compute_graph_metrics(graph)
+        max_degree = max(1, max_degree)
+        
+        # Get node degree metrics, normalized by max degree
+        normalized_in_degree = graph.in_degree(node) / max_degree
+        normalized_out_degree = graph.out_degree(node) / max_degree
+        
+        # Look up centrality metrics
+        node_betweenness = betweenness.get(node, 0.0)
+        node_closeness = closeness.get(node, 0.0)
+        
+        # Weighted scoring
+        # Nodes that many modules depend on (high in_degree) = high criticality
+        # Nodes that depend on many modules (high out_degree) = medium criticality
+        # Nodes with high betweenness = bridges = high criticality
+        
+        criticality = (
+            normalized_in_degree * 0.4 +      # How many depend on this
+            normalized_out_degree * 0.2 +      # How many this depends on
+            node_betweenness * 0.3 +           # Bridge importance
+            node_closeness * 0.1               # Proximity to other nodes
+        )
+        
+        return min(1.0, max(0.0, criticality))
     
     def _extract_services(self, components: set) -> List[str]:
         """Extract service names from component paths"""
-        services = set()
-        for component in components:
-            # Extract service name from component path (e.g., "services/payment/checkout" -> "payment")
-            parts = component.split('/')
-            if len(parts) >= 2 and parts[0] == 'services':
-                services.add(parts[1])
+        # Extract service name from component path (e.g., "services/payment/checkout" -> "payment")
+        match = _SERVICE_RE.match
+        services = {m.group(1) for m in map(match, components) if m}
         
-        return sorted(list(services))
+        return sorted(services)
     
     def _generate_recommendations(
         self,
@@ -202,18 +912,8 @@ class ImpactAnalyzer:
         changed_files: List[str]
     ) -> List[str]:
         """Generate recommendations based on impact analysis"""
-        recommendations = []
-        
         # Risk-based recommendations
-        if risk_level == "CRITICAL":
-            recommendations.append("URGENT: Extensive impact detected. Recommend staged rollout with feature flags")
-            recommendations.append("Implement enhanced monitoring and alerting")
-            recommendations.append("Consider rolling back plan if issues detected")
-        elif risk_level == "HIGH":
-            recommendations.append("High impact detected. Plan comprehensive testing")
-            recommendations.append("Deploy with caution, monitor all affected endpoints")
-        elif risk_level == "MEDIUM":
-            recommendations.append("Standard testing procedures recommended")
+        recommendations = list(_RISK_RECOMMENDATIONS.get(risk_level, ()))
         
         # Scale-based recommendations
         if impacted_count > 20:
@@ -222,15 +922,9 @@ class ImpactAnalyzer:
         if high_risk_count > 0:
             recommendations.append(f"Focus testing on {high_risk_count} high-criticality components")
         
-        # File-type recommendations
-        if any('database' in f.lower() for f in changed_files):
-            recommendations.append("Database schema changes detected. Verify migration strategy")
-        
-        if any('api' in f.lower() for f in changed_files):
-            recommendations.append("API changes detected. Verify backward compatibility")
-        
-        if any('auth' in f.lower() or 'security' in f.lower() for f in changed_files):
-            recommendations.append("Security-related changes. Perform security review")
+        # File-type recommendations from one scan over all lowercased paths
+        found = set(_FILE_TYPE_KEYWORDS_RE.findall("\n".join(changed_files).lower()))
+        recommendations.extend(message for keywords, message in _FILE_TYPE_RECOMMENDATIONS if not keywords.isdisjoint(found))
         
         return recommendations
 
@@ -238,6 +932,119 @@ class ImpactAnalyzer:
 # Initialize analyzer
 analyzer = ImpactAnalyzer()
 
+# Worker processes running the CPU-bound graph work; each keeps its own
+# graph cache. None runs the work inline on the event loop
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _warm_worker():
+    """Load the compiled scoring kernel once per worker process"""
+    _criticality_kernel(np.zeros(1), np.zeros(1), np.zeros(1), np.zeros(1), 1.0)
+
+
+def _analyze_impact_task(
+    changed_files: List[str],
+    graph_data: Dict,
+    sampling_k: Optional[int],
+    subgraph_centrality: bool
+) -> Dict[str, Any]:
+    """Run impact analysis with this process's analyzer"""
+    return analyzer.analyze_impact(changed_files, graph_data, sampling_k, subgraph_centrality)
+
+
+def _criticality_task(graph_data: Dict) -> Tuple[int, Dict[str, float]]:
+    """Score every node of a graph with this process's analyzer, reusing earlier scores"""
+    graph = analyzer.load_graph(graph_data)
+    
+    memo = analyzer.graph_memo(graph)
+    scores = memo.get("scores") if memo is not None else None
+    if scores is None:
+        scores = analyzer.score_nodes(graph, list(graph.nodes()))
+        if memo is not None:
+            memo["scores"] = scores
+    return graph.number_of_nodes(), scores
+
+
+def _warm_centralities_task(graph_data: Dict) -> Tuple[int, str]:
+    """Compute and cache a graph's centralities with this process's analyzer"""
+    graph = analyzer.load_graph(graph_data)
+    analyzer.compute_graph_metrics(graph)
+    return graph.number_of_nodes(), analyzer.graph_fingerprint(graph)
+
+
+def _paths_task(graph_data: Dict, source: str, target: str, path_limit: int, cutoff: int) -> Optional[Dict[str, Any]]:
+    """
+    Find bounded simple paths and the shortest path between two nodes
+    
+    Returns:
+        Path results, or None if source or target is not in the graph
+    """
+    graph = analyzer.load_graph(graph_data)
+    if source not in graph or target not in graph:
+        return None
+    
+    # Pull one path past the limit to tell whether the result is truncated
+    path_iter = nx.all_simple_paths(graph, source, target, cutoff=cutoff)
+    paths = list(islice(path_iter, path_limit + 1))
+    truncated = len(paths) > path_limit
+    
+    return {
+        "paths": paths[:path_limit],
+        "truncated": truncated,
+        "shortest_path": nx.shortest_path(graph, source, target) if nx.has_path(graph, source, target) else None
+    }
+
+
+def _graph_stats_task(graph_data: Dict) -> Dict[str, Any]:
+    """Compute (or reuse) graph statistics with this process's analyzer"""
+    graph = analyzer.load_graph(graph_data)
+    
+    memo = analyzer.graph_memo(graph)
+    stats = memo.get("stats") if memo is not None else None
+    if stats is None:
+        stats = _compute_graph_stats(graph, analyzer.degree_stats(graph)[0])
+        if memo is not None:
+            memo["stats"] = stats
+    return stats
+
+
+async def _run_cpu(task, *args):
+    """
+    Run a CPU-bound task in the worker pool, or inline when there is none
+    
+    Args:
+        task: Module-level task function
+        *args: Task arguments
+        
+    Returns:
+        Task result
+    """
+    if _process_pool is None:
+        return task(*args)
+    return await asyncio.get_running_loop().run_in_executor(_process_pool, task, *args)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start the analysis worker processes"""
+    global _process_pool
+    workers = int(os.getenv("ANALYZER_WORKERS", str(os.cpu_count() or 1)))
+    if workers > 0:
+        # spawn: forking would copy the parent's Numba/OpenMP thread state
+        _process_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker
+        )
+        logger.info(f"Started {workers} analysis worker processes")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the analysis worker processes"""
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+
 
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
@@ -251,17 +1058,35 @@ async def health_check():
 
 
 # Main analysis endpoint
-@app.post("/api/v1/analyze/impact", response_model=ImpactAnalysisResult)
-async def analyze_impact(request: AnalyzeImpactRequest):
+@app.post(
+    "/api/v1/analyze/impact",
+    responses={200: {"model": ImpactAnalysisResult}},
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": AnalyzeImpactRequest.model_json_schema()}}
+    }}
+)
+async def analyze_impact(http_request: Request):
     """
     Analyze impact of code changes using dependency graph
     """
+    try:
+        request = AnalyzeImpactRequest.model_validate(await _read_json(http_request))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    
     try:
         logger.info(f"Analyzing impact of {len(request.changed_files)} changed files")
         
-        result = analyzer.analyze_impact(request.changed_files, request.graph_data)
+        result = await _run_cpu(
+            _analyze_impact_task,
+            request.changed_files,
+            request.graph_data,
+            request.sampling_k,
+            request.subgraph_centrality
+        )
         
-        return {
+        return ORJSONResponse(content={
             "changed_files": result["changed_files"],
             "impacted_components": result["impacted_components"],
             "impacted_count": result["impacted_count"],
@@ -270,7 +1095,7 @@ async def analyze_impact(request: AnalyzeImpactRequest):
             "risk_level": result["risk_level"],
             "affected_services": result["affected_services"],
             "recommendations": result["recommendations"]
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error in impact analysis: {str(e)}")
@@ -278,24 +1103,37 @@ async def analyze_impact(request: AnalyzeImpactRequest):
 
 
 # Criticality calculation endpoint
-@app.post("/api/v1/criticality/calculate")
-async def calculate_criticality(graph_data: Dict[str, Any]):
+@app.post("/api/v1/criticality/calculate", openapi_extra=_GRAPH_BODY_DOC)
+async def calculate_criticality(
+    request: Request,
+    cache: bool = Query(False, description="Only compute and cache the centralities; omit scores")
+):
     """
     Calculate criticality scores for all nodes in the graph
+    
+    With cache=true the centralities are computed into the shared cache and
+    only the graph fingerprint is returned; the repository scanner uses this
+    to warm freshly stored graphs.
     """
+    graph_data = await _read_json(request)
     try:
-        graph = nx.node_link_graph(graph_data)
+        if cache:
+            node_count, fingerprint = await _run_cpu(_warm_centralities_task, graph_data)
+            return ORJSONResponse(content={
+                "status": "cached",
+                "node_count": node_count,
+                "fingerprint": fingerprint,
+                "timestamp": datetime.utcnow().isoformat()
+            })
         
-        criticality_scores = {}
-        for node in graph.nodes():
-            criticality_scores[node] = analyzer.calculate_criticality(node, graph)
+        node_count, criticality_scores = await _run_cpu(_criticality_task, graph_data)
         
-        return {
+        return ORJSONResponse(content={
             "status": "success",
-            "node_count": len(graph.nodes()),
+            "node_count": node_count,
             "criticality_scores": criticality_scores,
             "timestamp": datetime.utcnow().isoformat()
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error calculating criticality: {str(e)}")
@@ -303,28 +1141,36 @@ async def calculate_criticality(graph_data: Dict[str, Any]):
 
 
 # Path analysis endpoint
-@app.post("/api/v1/path/analyze")
-async def analyze_paths(graph_data: Dict[str, Any], source: str, target: str):
+@app.post("/api/v1/path/analyze", openapi_extra=_GRAPH_BODY_DOC)
+async def analyze_paths(
+    request: Request,
+    source: str,
+    target: str,
+    path_limit: int = Query(10, ge=1, le=1000),
+    cutoff: int = Query(8, ge=1)
+):
     """
-    Find all paths between two nodes in the dependency graph
+    Find simple paths between two nodes in the dependency graph
+    
+    Paths are generated lazily and at most path_limit paths of up to cutoff
+    edges are returned; truncated is set when more paths exist.
     """
+    graph_data = await _read_json(request)
     try:
-        graph = nx.node_link_graph(graph_data)
+        result = await _run_cpu(_paths_task, graph_data, source, target, path_limit, cutoff)
         
-        if source not in graph or target not in graph:
+        if result is None:
             raise HTTPException(status_code=404, detail="Source or target node not found")
         
-        # Find all simple paths
-        paths = list(nx.all_simple_paths(graph, source, target))
-        
-        return {
+        return ORJSONResponse(content={
             "source": source,
             "target": target,
-            "path_count": len(paths),
-            "paths": [list(p) for p in paths[:10]],  # Limit to first 10 paths
-            "shortest_path": nx.shortest_path(graph, source, target) if nx.has_path(graph, source, target) else None,
+            "path_count": len(result["paths"]),
+            "paths": result["paths"],
+            "truncated": result["truncated"],
+            "shortest_path": result["shortest_path"],
             "timestamp": datetime.utcnow().isoformat()
-        }
+        })
         
     except nx.NetworkXNoPath:
         return {
@@ -340,32 +1186,16 @@ async def analyze_paths(graph_data: Dict[str, Any], source: str, target: str):
 
 
 # Graph statistics endpoint
-@app.post("/api/v1/graph/stats")
-async def get_graph_stats(graph_data: Dict[str, Any]):
+@app.post("/api/v1/graph/stats", openapi_extra=_GRAPH_BODY_DOC)
+async def get_graph_stats(request: Request):
     """
     Get comprehensive statistics about the dependency graph
     """
+    graph_data = await _read_json(request)
     try:
-        graph = nx.node_link_graph(graph_data)
-        
-        stats = {
-            "node_count": graph.number_of_nodes(),
-            "edge_count": graph.number_of_edges(),
-            "density": nx.density(graph),
-            "is_dag": nx.is_directed_acyclic_graph(graph),
-            "is_connected": nx.is_weakly_connected(graph),
-            "number_of_components": nx.number_weakly_connected_components(graph),
-            "average_degree": 2 * graph.number_of_edges() / max(1, graph.number_of_nodes()),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
-        if graph.number_of_nodes() > 0:
-            # Find most central nodes
-            degree_centrality = nx.degree_centrality(graph)
-            top_nodes = sorted(degree_centrality.items(), key=lambda x: x[1], reverse=True)[:5]
-            stats["top_central_nodes"] = [{"node": n, "centrality": c} for n, c in top_nodes]
+        stats = await _run_cpu(_graph_stats_task, graph_data)
         
-        return {"status": "success", "stats": stats}
+        return ORJSONResponse(content={"status": "success", "stats": {**stats, "timestamp": datetime.utcnow().isoformat()}})
         
     except Exception as e:
         logger.error(f"Error getting graph stats: {str(e)}")
@@ -374,4 +1204,11 @@ async def get_graph_stats(graph_data: Dict[str, Any]):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8003)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8003,
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+        loop="uvloop",
+        http="httptools"
+    )
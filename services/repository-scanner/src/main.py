@@ -2,18 +2,19 @@
 Repository Scanner Service - Main Application
 Handles repository cloning, scanning, and dependency graph generation
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, HttpUrl
 from typing import List, Optional
 import logging
 import os
+import httpx
 from datetime import datetime
 
 from scanner.repository_analyzer import RepositoryAnalyzer
 from scanner.ast_parser import ASTParser
 from scanner.dependency_builder import DependencyGraphBuilder
-from scanner.database import MongoDB, RedisCache
+from scanner.database import MongoDB, RedisCache, probe_all
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +39,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Clones fetch only the files the parser reads unless CLONE_SOURCES_ONLY=false
+CLONE_SPARSE_PATTERNS = (
+    [f"*{extension}" for extension in ASTParser.SUPPORTED_EXTENSIONS]
+    if os.getenv("CLONE_SOURCES_ONLY", "true").lower() == "true" else None
+)
+
 # Initialize components
 repo_analyzer = RepositoryAnalyzer()
 ast_parser = ASTParser()
@@ -46,6 +53,12 @@ mongodb = MongoDB()
 redis_cache = RedisCache()
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Create database indexes"""
+    await mongodb.ensure_indexes()
+
+
 # Request/Response Models
 class ScanRequest(BaseModel):
     repo_url: str = Field(..., description="Git repository URL")
@@ -66,6 +79,7 @@ class GraphResponse(BaseModel):
     repo_id: str
     nodes_count: int
     edges_count: int
+    commit_sha: Optional[str] = None
     created_at: str
 
 
@@ -84,10 +98,7 @@ async def health_check():
         "status": "healthy",
         "service": "repository-scanner",
         "timestamp": datetime.utcnow().isoformat(),
-        "dependencies": {
-            "mongodb": mongodb.check_connection(),
-            "redis": redis_cache.check_connection()
-        }
+        "dependencies": await probe_all(mongodb, redis_cache)
     }
 
 
@@ -153,23 +164,24 @@ async def get_scan_status(scan_id: str):
 
 
 @app.get("/graph/{repo_id}", response_model=GraphResponse)
-async def get_dependency_graph(repo_id: str, branch: str = "main"):
-    """Get dependency graph for a repository"""
+async def get_dependency_graph(repo_id: str, branch: str = "main", commit_sha: Optional[str] = None):
+    """Get dependency graph for a repository, of a specific commit if given"""
     try:
-        # Check cache
-        cached_graph = await redis_cache.get_graph(repo_id, branch)
+        # Cached summaries are already response JSON; pass the bytes through
+        cached_graph = await redis_cache.get_graph_raw(repo_id, branch, commit_sha)
         if cached_graph:
-            return cached_graph
+            return Response(content=cached_graph, media_type="application/json")
         
         # Get from MongoDB
-        graph = await mongodb.get_graph(repo_id, branch)
+        graph = await mongodb.get_graph(repo_id, branch, commit_sha)
         if not graph:
             raise HTTPException(status_code=404, detail="Graph not found")
         
-        # Cache it
-        await redis_cache.set_graph(repo_id, branch, graph)
+        # Cache only the summary fields so the cached entry is the response
+        summary = GraphResponse(**graph).model_dump()
+        await redis_cache.set_graph(repo_id, branch, summary, commit_sha=graph.get("commit_sha"))
         
-        return graph
+        return summary
         
     except HTTPException:
         raise
@@ -186,7 +198,7 @@ async def get_changed_files(repo_id: str, commit_sha: Optional[str] = None):
         if not repo_path:
             raise HTTPException(status_code=404, detail="Repository not found")
         
-        changed_files = repo_analyzer.get_changed_files(repo_path, commit_sha)
+        changed_files = await repo_analyzer.get_changed_files_async(repo_path, commit_sha)
         
         return {
             "repo_id": repo_id,
@@ -202,6 +214,29 @@ async def get_changed_files(repo_id: str, commit_sha: Optional[str] = None):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def warm_centrality(graph_structure: dict):
+    """
+    Ask the impact analyzer to precompute and cache centralities for a graph
+    
+    Moves the betweenness/closeness cost off the first analysis request.
+    Failures are logged and otherwise ignored.
+    """
+    analyzer_url = os.getenv("IMPACT_ANALYZER_URL", "http://impact-analyzer:8003")
+    if not analyzer_url:
+        return
+    try:
+        async with httpx.AsyncClient(timeout=float(os.getenv("ANALYSIS_TIMEOUT", "300"))) as client:
+            response = await client.post(
+                f"{analyzer_url}/api/v1/criticality/calculate",
+                params={"cache": "true"},
+                json=graph_structure
+            )
+            response.raise_for_status()
+        logger.info(f"Warmed centrality cache for graph {response.json().get('fingerprint')}")
+    except Exception as e:
+        logger.warning(f"Error warming centrality cache: {str(e)}")
+
+
 async def process_repository_scan(scan_id: str, repo_url: str, branch: str, repo_id: str):
     """
     Background task to process repository scan
@@ -212,14 +247,15 @@ async def process_repository_scan(scan_id: str, repo_url: str, branch: str, repo
         
         # Clone repository
         logger.info(f"Cloning repository: {repo_url}")
-        repo_path = repo_analyzer.clone_repository(repo_url, branch)
+        repo_path = await repo_analyzer.clone_repository_async(repo_url, branch, CLONE_SPARSE_PATTERNS)
+        commit_sha = repo_analyzer.get_head_commit(repo_path)
         
         # Update status
         await mongodb.update_scan_status(scan_id, "processing", "Parsing code files")
         
         # Parse repository
         logger.info(f"Parsing repository at: {repo_path}")
-        ast_trees = ast_parser.parse_directory(repo_path)
+        ast_trees = await ast_parser.parse_directory_async(repo_path)
         
         # Update status
         await mongodb.update_scan_status(scan_id, "processing", "Building dependency graph")
@@ -230,7 +266,8 @@ async def process_repository_scan(scan_id: str, repo_url: str, branch: str, repo
         
         # Store graph
         logger.info(f"Storing dependency graph")
-        graph_id = await graph_builder.store_graph(graph, repo_id, branch, mongodb)
+        csr = graph_builder.serialize_csr(graph)
+        graph_id = await graph_builder.store_graph(graph, repo_id, branch, mongodb, csr=csr, commit_sha=commit_sha)
         
         # Cache the graph
         graph_data = {
@@ -238,9 +275,13 @@ async def process_repository_scan(scan_id: str, repo_url: str, branch: str, repo
             "repo_id": repo_id,
             "nodes_count": graph.number_of_nodes(),
             "edges_count": graph.number_of_edges(),
+            "commit_sha": commit_sha,
             "created_at": datetime.utcnow().isoformat()
         }
-        await redis_cache.set_graph(repo_id, branch, graph_data)
+        # Graphs are keyed by commit; caching the graph last moves the
+        # branch pointer only once both entries exist
+        await redis_cache.set_graph_csr(repo_id, branch, csr, commit_sha=commit_sha)
+        await redis_cache.set_graph(repo_id, branch, graph_data, commit_sha=commit_sha)
         
         # Update status to completed
         await mongodb.update_scan_status(
@@ -252,6 +293,9 @@ async def process_repository_scan(scan_id: str, repo_url: str, branch: str, repo
         
         logger.info(f"Scan completed successfully: {scan_id}")
         
+        # Precompute centralities now that the scan is reported complete
+        await warm_centrality(graph_builder.serialize_structure(graph))
+        
     except Exception as e:
         logger.error(f"Error processing scan: {str(e)}")
         await mongodb.update_scan_status(
@@ -263,4 +307,11 @@ async def process_repository_scan(scan_id: str, repo_url: str, branch: str, repo
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8001,
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+        loop="uvloop",
+        http="httptools"
+    )
@@ -3,13 +3,127 @@ AST Parser - Parses code files and extracts structural information
 Supports Python, JavaScript (basic), and Java files
 """
 import ast
+import asyncio
 import os
+import re
+import sys
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from pathlib import Path
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Imports, functions and classes are statements, which only occur in the
+# statement lists of these compound nodes (fields in _fields order);
+# walking just those skips every expression and simple statement subtree
+_STATEMENT_LIST_FIELDS = {
+    node_type: tuple(
+        field for field in node_type._fields
+        if field in ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+    )
+    for node_type in (
+        ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+        ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith,
+        ast.Try, getattr(ast, 'TryStar', ast.Try), ast.ExceptHandler,
+        ast.Match, ast.match_case
+    )
+}
+
+
+# Line prefixes the JavaScript/Java extractors act on; other lines only
+# matter if they contain the extractor's infix markers
+_JS_LINE_PREFIXES = ('import ', 'const ', 'export ', 'class ')
+_JAVA_LINE_PREFIXES = ('package ', 'import ')
+
+
+def _dotted_name(node: ast.AST) -> str:
+    """
+    Get the source text of a dotted name such as pkg.module.Base
+    
+    Args:
+        node: Name or Attribute node
+        
+    Returns:
+        Dotted name; other expressions fall back to ast.unparse
+    """
+    parts = []
+    current = node
+    while isinstance(current, ast.Attribute):
+        parts.append(current.attr)
+        current = current.value
+    if isinstance(current, ast.Name):
+        parts.append(current.id)
+        return '.'.join(reversed(parts))
+    return ast.unparse(node)
+
+
+def _iter_statements(tree: ast.AST) -> Iterator[ast.AST]:
+    """
+    Yield the statements of a module breadth-first
+    
+    Visits statements (plus except handlers and match cases) in the same
+    relative order as ast.walk without touching expression subtrees.
+    
+    Args:
+        tree: Parsed module
+        
+    Yields:
+        AST nodes
+    """
+    todo = deque([tree])
+    while todo:
+        node = todo.popleft()
+        yield node
+        for field in _STATEMENT_LIST_FIELDS.get(type(node), ()):
+            todo.extend(getattr(node, field))
+
+
+def _intern_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Intern the recurring strings of a file's extracted info
+    
+    Import names, import types, base classes and decorators repeat across
+    thousands of files; results from worker processes and the on-disk
+    cache arrive as separate copies, so interning them while merging
+    keeps one copy per distinct string.
+    
+    Args:
+        info: Extracted information for one file
+        
+    Returns:
+        The same info, updated in place
+    """
+    intern = sys.intern
+    if 'language' in info:
+        info['language'] = intern(info['language'])
+    for entry in info.get('imports', ()):
+        for key in ('name', 'type', 'module'):
+            value = entry.get(key)
+            if value.__class__ is str:
+                entry[key] = intern(value)
+    for func in info.get('functions', ()):
+        if 'decorators' in func:
+            func['decorators'] = [intern(d) for d in func['decorators']]
+    for cls in info.get('classes', ()):
+        if 'bases' in cls:
+            cls['bases'] = [intern(b) for b in cls['bases']]
+    return info
+
+
+def _parse_source_file(parser: "ASTParser", file_path: str, language: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Parse one file in a worker process, returning (info, error) instead of raising"""
+    try:
+        return parser.parse_file(file_path, language), None
+    except Exception as e:
+        return None, str(e)
+
 
 class ASTParser:
     """Parses Abstract Syntax Trees from source code files"""
@@ -23,8 +137,25 @@ class ASTParser:
         '.java': 'java',
     }
     
+    # Common non-source directories that are never descended into
+    SKIP_DIRS = frozenset({'.git', '__pycache__', 'node_modules', '.venv', 'venv'})
+    
+    # Minified bundles and generated code are large and carry no
+    # hand-written dependencies, so they are not parsed
+    SKIP_SUFFIXES = ('.min.js', '.bundle.js')
+    SKIP_RE = re.compile(r'(?:_pb2\.py|_pb2_grpc\.py|\.generated\.[^.]+|\.d\.ts)$')
+    
+    # Bump when the extracted info changes so cached results are recomputed
+    PARSER_VERSION = 1
+    
     def __init__(self):
-        pass
+        # Extracted info by source hash; empty AST_CACHE_DIR disables the cache
+        self.cache_dir = os.getenv("AST_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ast-cache"))
+        # Worker processes for parsing; smaller trees are parsed in process
+        self.parse_workers = int(os.getenv("PARSE_WORKERS", str(min(os.cpu_count() or 1, 8))))
+        self.parallel_min_files = int(os.getenv("PARSE_PARALLEL_MIN_FILES", "64"))
+        # Larger files are skipped; 0 parses files of any size
+        self.max_file_bytes = int(os.getenv("PARSE_MAX_FILE_BYTES", str(512 * 1024)))
     
     def parse_directory(self, directory: str) -> Dict[str, Any]:
         """
@@ -39,31 +170,32 @@ class ASTParser:
         try:
             parsed_files = {}
             
-            for root, dirs, files in os.walk(directory):
-                # Skip common non-source directories
-                dirs[:] = [d for d in dirs if d not in ['.git', '__pycache__', 'node_modules', '.venv', 'venv']]
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(file_path, directory)
-                    
-                    # Check if file is supported
-                    ext = os.path.splitext(file)[1]
-                    if ext not in self.SUPPORTED_EXTENSIONS:
-                        continue
-                    
-                    language = self.SUPPORTED_EXTENSIONS[ext]
-                    
-                    try:
-                        if language == 'python':
-                            parsed_files[relative_path] = self.parse_python(file_path)
-                        elif language in ['javascript', 'typescript']:
-                            parsed_files[relative_path] = self.parse_javascript(file_path)
-                        elif language == 'java':
-                            parsed_files[relative_path] = self.parse_java(file_path)
-                    except Exception as e:
-                        logger.warning(f"Error parsing {relative_path}: {str(e)}")
-                        continue
+            skipped = []
+            sources = list(self._iter_source_files(directory, skipped))
+            if skipped:
+                logger.info(f"Skipped {len(skipped)} generated, minified or oversized files in {directory}")
+            file_paths = [file_path for file_path, _, _ in sources]
+            languages = [language for _, _, language in sources]
+            
+            if self.parse_workers > 1 and len(sources) >= self.parallel_min_files:
+                # Files parse independently and CPU-bound; spawn avoids forking
+                # the service's event loop and client threads
+                with ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    results = list(executor.map(
+                        _parse_source_file, repeat(self), file_paths, languages, chunksize=32
+                    ))
+            else:
+                results = map(_parse_source_file, repeat(self), file_paths, languages)
+            
+            for (_, relative_path, _), (info, error) in zip(sources, results):
+                if error is not None:
+                    logger.warning(f"Error parsing {relative_path}: {error}")
+                    continue
+                if info is not None:
+                    parsed_files[relative_path] = _intern_info(info)
             
             logger.info(f"Parsed {len(parsed_files)} files from {directory}")
             return parsed_files
@@ -72,6 +204,108 @@ class ASTParser:
             logger.error(f"Error parsing directory {directory}: {str(e)}")
             return {}
     
+    async def parse_directory_async(self, directory: str) -> Dict[str, Any]:
+        """
+        Parse all supported files in a directory without blocking the event loop
+        
+        The walk, reads and any in-process parsing run on the default
+        thread pool, so health checks and status requests keep being
+        served during a scan.
+        
+        Args:
+            directory: Root directory to scan
+            
+        Returns:
+            Dictionary with parsing results for all files
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.parse_directory, directory)
+    
+    def parse_file(self, file_path: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a file with the parser for its language
+        
+        Args:
+            file_path: Path to source file
+            language: Language from SUPPORTED_EXTENSIONS
+            
+        Returns:
+            Dictionary with extracted information, or None for unknown languages
+        """
+        if language == 'python':
+            return self.parse_python(file_path)
+        elif language in ['javascript', 'typescript']:
+            return self.parse_javascript(file_path)
+        elif language == 'java':
+            return self.parse_java(file_path)
+        return None
+    
+    def _iter_source_files(self, directory: str, skipped: Optional[List[str]] = None) -> Iterator[Tuple[str, str, str]]:
+        """
+        Walk a directory for supported source files
+        
+        Uses os.scandir so file types come from the directory listing
+        instead of a stat per entry. Visits directories in the same order
+        as a top-down os.walk and, like it, does not follow directory
+        symlinks. Generated and minified files (SKIP_SUFFIXES, SKIP_RE) and
+        files above max_file_bytes are left out.
+        
+        Args:
+            directory: Root directory to scan
+            skipped: Optional list collecting relative paths of left-out files
+            
+        Yields:
+            Tuples of (file path, path relative to directory, language)
+        """
+        prefix_len = len(os.path.join(directory, ''))
+        stack = [directory]
+        
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    subdirs = []
+                    for entry in entries:
+                        if entry.is_dir():
+                            if entry.name not in self.SKIP_DIRS and not entry.is_symlink():
+                                subdirs.append(entry.path)
+                            continue
+                        
+                        language = self.SUPPORTED_EXTENSIONS.get(os.path.splitext(entry.name)[1])
+                        if language is None:
+                            continue
+                        
+                        if self._should_skip(entry):
+                            if skipped is not None:
+                                skipped.append(entry.path[prefix_len:])
+                            continue
+                        yield entry.path, entry.path[prefix_len:], language
+            except OSError as e:
+                logger.debug(f"Skipping unreadable directory: {str(e)}")
+                continue
+            
+            # Reversed so directories pop in listing order
+            stack.extend(reversed(subdirs))
+    
+    def _should_skip(self, entry: os.DirEntry) -> bool:
+        """
+        Check whether a source file is generated, minified or too large to parse
+        
+        Args:
+            entry: Directory entry of a supported source file
+            
+        Returns:
+            True if the file should not be parsed
+        """
+        name = entry.name
+        if name.endswith(self.SKIP_SUFFIXES) or self.SKIP_RE.search(name):
+            return True
+        if self.max_file_bytes > 0:
+            try:
+                return entry.stat().st_size > self.max_file_bytes
+            except OSError:
+                return False
+        return False
+    
     def parse_python(self, file_path: str) -> Dict[str, Any]:
         """
         Parse Python file using AST
@@ -83,8 +317,19 @@ class ASTParser:
             Dictionary with extracted information
         """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            # Hash the raw bytes so cache hits skip decoding altogether
+            with open(file_path, 'rb') as f:
+                source = f.read()
+            
+            content_hash = hashlib.sha256(source).hexdigest()
+            cached = self._load_cached_info(content_hash)
+            if cached is not None:
+                return cached
+            
+            # Same text as reading in text mode: lenient UTF-8 plus universal newlines
+            content = source.decode('utf-8', errors='ignore')
+            if '\r' in content:
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
             
             tree = ast.parse(content, filename=file_path)
             
@@ -95,10 +340,10 @@ class ASTParser:
                 'classes': [],
                 'async_functions': [],
                 'decorators': [],
-                'lines_of_code': len(content.split('\n'))
+                'lines_of_code': content.count('\n') + 1
             }
             
-            for node in ast.walk(tree):
+            for node in _iter_statements(tree):
                 # Extract imports
                 if isinstance(node, ast.Import):
                     for alias in node.names:
@@ -143,7 +388,7 @@ class ASTParser:
                         if isinstance(base, ast.Name):
                             bases.append(base.id)
                         elif isinstance(base, ast.Attribute):
-                            bases.append(ast.unparse(base))
+                            bases.append(_dotted_name(base))
                     
                     info['classes'].append({
                         'name': node.name,
@@ -152,6 +397,7 @@ class ASTParser:
                         'methods': [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
                     })
             
+            self._store_cached_info(content_hash, info)
             return info
             
         except SyntaxError as e:
@@ -161,6 +407,62 @@ class ASTParser:
             logger.error(f"Error parsing Python file {file_path}: {str(e)}")
             raise
     
+    def _cache_path(self, content_hash: str) -> str:
+        """Get the cache file path for a source hash"""
+        return os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}.json")
+    
+    def _load_cached_info(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Load extracted info for a source hash from the on-disk cache
+        
+        The cache directory may sit on the same volume as untrusted clones,
+        so entries are plain JSON data and never unpickled.
+        
+        Args:
+            content_hash: SHA-256 of the source
+            
+        Returns:
+            Cached info, or None on a miss or a stale parser/Python version
+        """
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(content_hash), 'rb') as f:
+                payload = orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable AST cache entry {content_hash}: {str(e)}")
+            return None
+        
+        if not isinstance(payload, dict) or not isinstance(payload.get('info'), dict):
+            return None
+        if payload.get('v') != self.PARSER_VERSION or payload.get('py') != list(sys.version_info[:2]):
+            return None
+        return payload['info']
+    
+    def _store_cached_info(self, content_hash: str, info: Dict[str, Any]):
+        """
+        Store extracted info for a source hash in the on-disk cache
+        
+        Args:
+            content_hash: SHA-256 of the source
+            info: Extracted information
+        """
+        if not self.cache_dir:
+            return
+        try:
+            path = self._cache_path(content_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps({'v': self.PARSER_VERSION, 'py': sys.version_info[:2], 'info': info}))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.debug(f"Error writing AST cache entry {content_hash}: {str(e)}")
+    
     def parse_javascript(self, file_path: str) -> Dict[str, Any]:
         """
         Basic parsing of JavaScript/TypeScript files
@@ -173,57 +475,63 @@ class ASTParser:
             Dictionary with extracted information (basic)
         """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
             info = {
                 'language': 'javascript',
                 'imports': [],
                 'exports': [],
                 'functions': [],
                 'classes': [],
-                'lines_of_code': len(content.split('\n'))
+                'lines_of_code': 0
             }
             
-            lines = content.split('\n')
+            # Stream lines instead of holding the whole file plus a split copy
+            line_count = 1
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for i, line in enumerate(f):
+                    if line.endswith('\n'):
+                        line_count += 1
+                    
+                    # Cheap reject for the bulk of lines before stripping and dispatch
+                    if 'function ' not in line and '=>' not in line and not line.lstrip().startswith(_JS_LINE_PREFIXES):
+                        continue
+                    line = line.strip()
+                    
+                    # Extract imports
+                    if line.startswith('import ') or line.startswith('const ') and 'require' in line:
+                        info['imports'].append({
+                            'line': i + 1,
+                            'statement': line[:100]  # First 100 chars
+                        })
+                    
+                    # Extract exports
+                    elif line.startswith('export '):
+                        info['exports'].append({
+                            'line': i + 1,
+                            'statement': line[:100]
+                        })
+                    
+                    # Extract function declarations
+                    elif 'function ' in line or '=>' in line:
+                        # Extract function name if possible
+                        if 'function ' in line:
+                            parts = line.split('function ')
+                            if len(parts) > 1:
+                                func_name = parts[1].split('(')[0].strip()
+                                info['functions'].append({
+                                    'name': func_name,
+                                    'line': i + 1,
+                                    'type': 'declaration'
+                                })
+                    
+                    # Extract class definitions
+                    elif line.startswith('class '):
+                        class_name = line.split('class ')[1].split('{')[0].split('(')[0].strip()
+                        info['classes'].append({
+                            'name': class_name,
+                            'line': i + 1
+                        })
             
-            for i, line in enumerate(lines):
-                line = line.strip()
-                
-                # Extract imports
-                if line.startswith('import ') or line.startswith('const ') and 'require' in line:
-                    info['imports'].append({
-                        'line': i + 1,
-                        'statement': line[:100]  # First 100 chars
-                    })
-                
-                # Extract exports
-                elif line.startswith('export '):
-                    info['exports'].append({
-                        'line': i + 1,
-                        'statement': line[:100]
-                    })
-                
-                # Extract function declarations
-                elif 'function ' in line or '=>' in line:
-                    # Extract function name if possible
-                    if 'function ' in line:
-                        parts = line.split('function ')
-                        if len(parts) > 1:
-                            func_name = parts[1].split('(')[0].strip()
-                            info['functions'].append({
-                                'name': func_name,
-                                'line': i + 1,
-                                'type': 'declaration'
-                            })
-                
-                # Extract class definitions
-                elif line.startswith('class '):
-                    class_name = line.split('class ')[1].split('{')[0].split('(')[0].strip()
-                    info['classes'].append({
-                        'name': class_name,
-                        'line': i + 1
-                    })
+            info['lines_of_code'] = line_count
             
             return info
             
@@ -242,55 +550,61 @@ class ASTParser:
             Dictionary with extracted information (basic)
         """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
             info = {
                 'language': 'java',
                 'imports': [],
                 'packages': [],
                 'classes': [],
                 'interfaces': [],
-                'lines_of_code': len(content.split('\n'))
+                'lines_of_code': 0
             }
             
-            lines = content.split('\n')
-            
-            for i, line in enumerate(lines):
-                line = line.strip()
-                
-                # Extract package declaration
-                if line.startswith('package '):
-                    package = line.replace('package ', '').replace(';', '').strip()
-                    info['packages'].append(package)
-                
-                # Extract imports
-                elif line.startswith('import '):
-                    import_stmt = line.replace('import ', '').replace(';', '').strip()
-                    info['imports'].append({
-                        'name': import_stmt,
-                        'line': i + 1
-                    })
-                
-                # Extract class definitions
-                elif ' class ' in line:
-                    parts = line.split(' class ')
-                    if len(parts) > 1:
-                        class_name = parts[1].split('{')[0].split('(')[0].strip()
-                        info['classes'].append({
-                            'name': class_name,
-                            'line': i + 1
-                        })
-                
-                # Extract interface definitions
-                elif ' interface ' in line:
-                    parts = line.split(' interface ')
-                    if len(parts) > 1:
-                        interface_name = parts[1].split('{')[0].strip()
-                        info['interfaces'].append({
-                            'name': interface_name,
+            # Stream lines instead of holding the whole file plus a split copy
+            line_count = 1
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for i, line in enumerate(f):
+                    if line.endswith('\n'):
+                        line_count += 1
+                    
+                    # Cheap reject for the bulk of lines before stripping and dispatch
+                    if ' class ' not in line and ' interface ' not in line and not line.lstrip().startswith(_JAVA_LINE_PREFIXES):
+                        continue
+                    line = line.strip()
+                    
+                    # Extract package declaration
+                    if line.startswith('package '):
+                        package = line.replace('package ', '').replace(';', '').strip()
+                        info['packages'].append(package)
+                    
+                    # Extract imports
+                    elif line.startswith('import '):
+                        import_stmt = line.replace('import ', '').replace(';', '').strip()
+                        info['imports'].append({
+                            'name': import_stmt,
                             'line': i + 1
                         })
+                    
+                    # Extract class definitions
+                    elif ' class ' in line:
+                        parts = line.split(' class ')
+                        if len(parts) > 1:
+                            class_name = parts[1].split('{')[0].split('(')[0].strip()
+                            info['classes'].append({
+                                'name': class_name,
+                                'line': i + 1
+                            })
+                    
+                    # Extract interface definitions
+                    elif ' interface ' in line:
+                        parts = line.split(' interface ')
+                        if len(parts) > 1:
+                            interface_name = parts[1].split('{')[0].strip()
+                            info['interfaces'].append({
+                                'name': interface_name,
+                                'line': i + 1
+                            })
+            
+            info['lines_of_code'] = line_count
             
             return info
             
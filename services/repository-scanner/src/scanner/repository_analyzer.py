@@ -2,6 +2,8 @@
 Repository Analyzer - Handles Git operations
 """
 import os
+import json
+import asyncio
 import tempfile
 import shutil
 from typing import List, Optional
@@ -18,15 +20,20 @@ class RepositoryAnalyzer:
     def __init__(self):
         self.clone_path = os.getenv("GIT_CLONE_PATH", "/tmp/repos")
         self.clone_timeout = int(os.getenv("GIT_CLONE_TIMEOUT", "300"))
+        # Update an earlier clone of the same repository and branch in place
+        self.reuse_clones = os.getenv("CLONE_REUSE", "true").lower() == "true"
         os.makedirs(self.clone_path, exist_ok=True)
     
-    def clone_repository(self, repo_url: str, branch: str = "main") -> str:
+    def clone_repository(self, repo_url: str, branch: str = "main",
+                         sparse_patterns: Optional[List[str]] = None) -> str:
         """
         Clone a Git repository
         
         Args:
             repo_url: Git repository URL
             branch: Branch to clone
+            sparse_patterns: Optional gitignore-style patterns (e.g. "*.py");
+                when given, only matching files are downloaded and checked out
             
         Returns:
             Local path to cloned repository
@@ -36,12 +43,26 @@ class RepositoryAnalyzer:
             repo_name = repo_url.split("/")[-1].replace(".git", "")
             local_path = os.path.join(self.clone_path, f"{repo_name}_{branch}")
             
+            if self.reuse_clones and self._update_existing_clone(repo_url, local_path, branch, sparse_patterns):
+                return local_path
+            
             # Remove existing directory if it exists
             if os.path.exists(local_path):
                 shutil.rmtree(local_path)
             
             logger.info(f"Cloning repository {repo_url} (branch: {branch}) to {local_path}")
             
+            if sparse_patterns:
+                try:
+                    self._sparse_clone(repo_url, local_path, branch, sparse_patterns)
+                    self._write_clone_meta(local_path, repo_url, branch, sparse_patterns)
+                    logger.info(f"Successfully cloned matching files to {local_path}")
+                    return local_path
+                except GitCommandError as e:
+                    # Servers without partial clone support reject the filter
+                    logger.warning(f"Sparse clone failed, cloning full tree: {str(e)}")
+                    shutil.rmtree(local_path, ignore_errors=True)
+            
             # Clone the repository
             Repo.clone_from(
                 repo_url,
@@ -49,6 +70,7 @@ class RepositoryAnalyzer:
                 branch=branch,
                 depth=1  # Shallow clone for faster cloning
             )
+            self._write_clone_meta(local_path, repo_url, branch, None)
             
             logger.info(f"Successfully cloned repository to {local_path}")
             return local_path
@@ -60,6 +82,120 @@ class RepositoryAnalyzer:
             logger.error(f"Error cloning repository: {str(e)}")
             raise
     
+    def _clone_meta_path(self, local_path: str) -> str:
+        """Get the path of the metadata recorded for a clone"""
+        return os.path.join(local_path, ".git", "scanner-clone.json")
+    
+    def _write_clone_meta(self, local_path: str, repo_url: str, branch: str, sparse_patterns: Optional[List[str]]):
+        """Record what a clone was made from so later scans can reuse it"""
+        try:
+            with open(self._clone_meta_path(local_path), "w") as f:
+                json.dump({"repo_url": repo_url, "branch": branch, "sparse_patterns": sparse_patterns}, f)
+        except OSError as e:
+            logger.debug(f"Error writing clone metadata: {str(e)}")
+    
+    def _update_existing_clone(self, repo_url: str, local_path: str, branch: str,
+                               sparse_patterns: Optional[List[str]]) -> bool:
+        """
+        Bring an earlier clone up to date instead of recloning
+        
+        The clone is reused only if it was made from the same URL, branch
+        and sparse patterns. One ls-remote round trip tells whether the
+        branch moved; if it did, the new tip is fetched shallowly and
+        checked out over the old one.
+        
+        Args:
+            repo_url: Git repository URL
+            local_path: Clone location
+            branch: Branch to scan
+            sparse_patterns: Sparse patterns the clone must have been made with
+            
+        Returns:
+            True if local_path now holds the branch tip
+        """
+        try:
+            with open(self._clone_meta_path(local_path)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if meta != {"repo_url": repo_url, "branch": branch, "sparse_patterns": sparse_patterns}:
+            return False
+        
+        try:
+            repo = Repo(local_path)
+            remote = repo.git.ls_remote(repo_url, f"refs/heads/{branch}").split()
+            if not remote:
+                return False
+            if remote[0] == repo.head.commit.hexsha:
+                logger.info(f"Reusing up-to-date clone at {local_path}")
+                return True
+            
+            repo.git.fetch("--depth=1", "origin", branch)
+            repo.git.reset("--hard", "FETCH_HEAD")
+            logger.info(f"Updated existing clone at {local_path} to {remote[0]}")
+            return True
+        except Exception as e:
+            logger.warning(f"Error updating existing clone, recloning: {str(e)}")
+            return False
+    
+    def _sparse_clone(self, repo_url: str, local_path: str, branch: str, sparse_patterns: List[str]):
+        """
+        Shallow partial clone that only fetches and checks out matching files
+        
+        The clone starts without any file contents (--filter=blob:none);
+        checking out with a sparse pattern list then fetches only the blobs
+        of matching files, so images, data and vendored binaries are never
+        downloaded.
+        
+        Args:
+            repo_url: Git repository URL
+            local_path: Clone destination
+            branch: Branch to clone
+            sparse_patterns: Gitignore-style patterns of files to check out
+        """
+        repo = Repo.clone_from(
+            repo_url,
+            local_path,
+            branch=branch,
+            depth=1,
+            filter="blob:none",
+            no_checkout=True
+        )
+        repo.git.sparse_checkout("set", "--no-cone", *sparse_patterns)
+        repo.git.checkout(branch)
+    
+    async def clone_repository_async(self, repo_url: str, branch: str = "main",
+                                     sparse_patterns: Optional[List[str]] = None) -> str:
+        """
+        Clone a Git repository without blocking the event loop
+        
+        Args:
+            repo_url: Git repository URL
+            branch: Branch to clone
+            sparse_patterns: Optional patterns of the only files to fetch
+            
+        Returns:
+            Local path to cloned repository
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.clone_repository, repo_url, branch, sparse_patterns)
+    
+    def get_head_commit(self, repo_path: str) -> Optional[str]:
+        """
+        Get the SHA of the checked-out commit
+        
+        Args:
+            repo_path: Local path to repository
+            
+        Returns:
+            Commit SHA, or None if it cannot be read
+        """
+        try:
+            return Repo(repo_path).head.commit.hexsha
+        except Exception as e:
+            logger.warning(f"Error reading HEAD commit: {str(e)}")
+            return None
+    
     def get_changed_files(self, repo_path: str, commit_sha: Optional[str] = None) -> List[str]:
         """
         Get list of changed files
@@ -72,13 +208,13 @@ class RepositoryAnalyzer:
             List of changed file paths
         """
         try:
-            changed_files = []
+            changed_files = set()
             
             if commit_sha:
                 # Get files changed in specific commit
                 for commit in Repository(repo_path, single=commit_sha).traverse_commits():
                     for modified_file in commit.modified_files:
-                        changed_files.append(modified_file.new_path or modified_file.old_path)
+                        changed_files.add(modified_file.new_path or modified_file.old_path)
             else:
                 # Get files changed in last commit
                 repo = Repo(repo_path)
@@ -88,18 +224,33 @@ class RepositoryAnalyzer:
                         parent = last_commit.parents[0]
                         diffs = parent.diff(last_commit)
                         for diff in diffs:
+                            # Renames contribute both paths; the set keeps one copy otherwise
                             if diff.a_path:
-                                changed_files.append(diff.a_path)
-                            if diff.b_path and diff.b_path != diff.a_path:
-                                changed_files.append(diff.b_path)
+                                changed_files.add(diff.a_path)
+                            if diff.b_path:
+                                changed_files.add(diff.b_path)
             
             logger.info(f"Found {len(changed_files)} changed files")
-            return list(set(changed_files))  # Remove duplicates
+            return list(changed_files)
             
         except Exception as e:
             logger.error(f"Error getting changed files: {str(e)}")
             raise
     
+    async def get_changed_files_async(self, repo_path: str, commit_sha: Optional[str] = None) -> List[str]:
+        """
+        Get list of changed files without blocking the event loop
+        
+        Args:
+            repo_path: Path to Git repository
+            commit_sha: Specific commit SHA (optional)
+            
+        Returns:
+            List of changed file paths
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_changed_files, repo_path, commit_sha)
+    
     def get_file_content(self, repo_path: str, file_path: str) -> str:
         """
         Get content of a specific file
@@ -119,6 +270,25 @@ class RepositoryAnalyzer:
             logger.error(f"Error reading file {file_path}: {str(e)}")
             return ""
     
+    def get_file_bytes(self, repo_path: str, file_path: str) -> bytes:
+        """
+        Get raw content of a specific file, for callers that hash or parse bytes
+        
+        Args:
+            repo_path: Path to Git repository
+            file_path: Relative path to file in repository
+            
+        Returns:
+            File content as bytes
+        """
+        try:
+            full_path = os.path.join(repo_path, file_path)
+            with open(full_path, 'rb') as f:
+                return f.read()
+        except Exception as e:
+            logger.error(f"Error reading file {file_path}: {str(e)}")
+            return b""
+    
     def get_commit_history(self, repo_path: str, max_commits: int = 10) -> List[dict]:
         """
         Get commit history
@@ -0,0 +1,99 @@
+"""
+Unit Tests for AI Orchestrator - Batching
+"""
+import asyncio
+from services.ai_orchestrator.src.agents.batching import BatchScheduler
+
+
+class RecordingBatchFn:
+    """Batch function doubling its items and recording each batch"""
+    
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+    
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0)
+        return [ValueError(item) if item == self.fail_on else item * 2 for item in items]
+
+
+def test_batches_concurrent_submits():
+    """Concurrent submits share batches of at most max_batch_size, in order"""
+    batch_fn = RecordingBatchFn()
+    
+    async def run():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=3, max_wait_ms=100)
+        try:
+            return await asyncio.gather(*(scheduler.submit(i) for i in range(7)))
+        finally:
+            await scheduler.close()
+    
+    results = asyncio.run(run())
+    
+    assert results == [i * 2 for i in range(7)]
+    # The last partial batch waits for max_wait_ms, the full ones don't
+    assert batch_fn.batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_flushes_partial_batch_after_max_wait():
+    """A partial batch is dispatched once max_wait_ms has passed"""
+    batch_fn = RecordingBatchFn()
+    
+    async def run():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=16, max_wait_ms=20)
+        try:
+            return await asyncio.wait_for(asyncio.gather(scheduler.submit(1), scheduler.submit(2)), 1)
+        finally:
+            await scheduler.close()
+    
+    assert asyncio.run(run()) == [2, 4]
+    assert batch_fn.batches == [[1, 2]]
+
+
+def test_exception_result_raised_in_matching_caller():
+    """An exception result fails only the caller whose item produced it"""
+    batch_fn = RecordingBatchFn(fail_on=2)
+    
+    async def run():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=3, max_wait_ms=1000)
+        try:
+            return await asyncio.gather(*(scheduler.submit(i) for i in range(3)), return_exceptions=True)
+        finally:
+            await scheduler.close()
+    
+    first, second, failed = asyncio.run(run())
+    
+    assert (first, second) == (0, 2)
+    assert isinstance(failed, ValueError)
+
+
+def test_batch_fn_error_raised_in_every_caller():
+    """An error raised by the batch function fails the whole batch"""
+    async def broken(items):
+        raise RuntimeError("backend down")
+    
+    async def run():
+        scheduler = BatchScheduler(broken, max_batch_size=2, max_wait_ms=1000)
+        try:
+            return await asyncio.gather(scheduler.submit(1), scheduler.submit(2), return_exceptions=True)
+        finally:
+            await scheduler.close()
+    
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+
+
+def test_submit_after_close_restarts_collector():
+    """A closed scheduler starts collecting again on the next submit"""
+    batch_fn = RecordingBatchFn()
+    
+    async def run():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=1, max_wait_ms=0)
+        first = await scheduler.submit(1)
+        await scheduler.close()
+        second = await asyncio.wait_for(scheduler.submit(2), 1)
+        await scheduler.close()
+        return first, second
+    
+    assert asyncio.run(run()) == (2, 4)
+    assert batch_fn.batches == [[1], [2]]
@@ -0,0 +1,105 @@
+"""
+Unit Tests for AI Orchestrator - Concurrency
+"""
+import asyncio
+import pytest
+from services.ai_orchestrator.src.agents.concurrency import AdaptiveConcurrencyLimiter
+
+
+class RateLimited(Exception):
+    """Stand-in for the backend's rate-limit error"""
+
+
+async def _call(limiter, error=None):
+    """Make one call through the limiter, optionally failing with error"""
+    async with limiter:
+        await asyncio.sleep(0)
+        if error is not None:
+            raise error
+
+
+async def _fail(limiter, error):
+    """Make one call through the limiter that fails with error"""
+    with pytest.raises(type(error)):
+        await _call(limiter, error)
+
+
+def test_bounds_inflight_calls():
+    """No more than limit calls run at once"""
+    limiter = AdaptiveConcurrencyLimiter(max_inflight=3, rate_limit_errors=(RateLimited,))
+    inflight = 0
+    peak = 0
+    
+    async def call():
+        nonlocal inflight, peak
+        async with limiter:
+            inflight += 1
+            peak = max(peak, inflight)
+            await asyncio.sleep(0.01)
+            inflight -= 1
+    
+    async def run():
+        await asyncio.gather(*(call() for _ in range(10)))
+    
+    asyncio.run(run())
+    
+    assert peak == 3
+
+
+def test_rate_limit_halves_limit_once_per_cooldown():
+    """A burst of rate-limit errors within one cooldown halves the limit once"""
+    limiter = AdaptiveConcurrencyLimiter(max_inflight=8, cooldown_s=60, rate_limit_errors=(RateLimited,))
+    
+    async def run():
+        await _fail(limiter, RateLimited())
+        await _fail(limiter, RateLimited())
+        assert limiter.limit == 4
+        
+        # Successes inside the cooldown don't grow the limit back
+        await _call(limiter)
+        assert limiter.limit == 4
+    
+    asyncio.run(run())
+
+
+def test_limit_grows_back_after_cooldown():
+    """After the cooldown each success raises the limit by one, up to max_inflight"""
+    limiter = AdaptiveConcurrencyLimiter(max_inflight=8, cooldown_s=0, rate_limit_errors=(RateLimited,))
+    
+    async def run():
+        await _fail(limiter, RateLimited())
+        assert limiter.limit == 4
+        
+        for expected in (5, 6, 7, 8, 8):
+            await _call(limiter)
+            assert limiter.limit == expected
+    
+    asyncio.run(run())
+
+
+def test_limit_never_below_min_inflight():
+    """Repeated rate limiting stops at min_inflight"""
+    limiter = AdaptiveConcurrencyLimiter(
+        max_inflight=8, min_inflight=3, cooldown_s=0, rate_limit_errors=(RateLimited,)
+    )
+    
+    async def run():
+        for _ in range(5):
+            await _fail(limiter, RateLimited())
+    
+    asyncio.run(run())
+    
+    assert limiter.limit == 3
+
+
+def test_other_errors_leave_limit_unchanged():
+    """Errors that are not rate limits neither shrink nor grow the limit"""
+    limiter = AdaptiveConcurrencyLimiter(max_inflight=8, cooldown_s=0, rate_limit_errors=(RateLimited,))
+    
+    async def run():
+        await _fail(limiter, RateLimited())
+        await _fail(limiter, ValueError("bad request"))
+    
+    asyncio.run(run())
+    
+    assert limiter.limit == 4
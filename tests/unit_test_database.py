@@ -0,0 +1,92 @@
+"""
+Unit Tests for Repository Scanner - Database
+"""
+import asyncio
+import pytest
+from services.repository_scanner.src.scanner.database import MongoDB
+
+
+@pytest.fixture
+def mongodb():
+    """MongoDB wrapper on an in-memory database, recording each bulk scan write"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    mongodb = MongoDB()
+    mongodb.db = mongomock_motor.AsyncMongoMockClient()["impact_analysis"]
+    mongodb.scan_flush_delay = 0.01
+    
+    mongodb.bulk_writes = []
+    bulk_upsert_scans = mongodb.bulk_upsert_scans
+    
+    async def recording_bulk_upsert(items):
+        mongodb.bulk_writes.append(items)
+        await bulk_upsert_scans(items)
+    
+    mongodb.bulk_upsert_scans = recording_bulk_upsert
+    return mongodb
+
+
+def test_concurrent_updates_share_one_bulk_write(mongodb):
+    """Updates arriving together are written in one round trip"""
+    async def run():
+        await asyncio.gather(*(
+            mongodb.update_scan_status(f"scan-{i}", "scanning", "Cloning") for i in range(5)
+        ))
+        return [await mongodb.get_scan_status(f"scan-{i}") for i in range(5)]
+    
+    scans = asyncio.run(run())
+    
+    assert len(mongodb.bulk_writes) == 1
+    assert all(scan['status'] == 'scanning' for scan in scans)
+
+
+def test_updates_of_one_scan_merge(mongodb):
+    """Later fields of the same scan override earlier ones in the batch"""
+    async def run():
+        await asyncio.gather(
+            mongodb.update_scan_status("scan-1", "scanning", "Parsing", graph_id="graph-1"),
+            mongodb.update_scan_status("scan-1", "completed", "Done")
+        )
+        return await mongodb.get_scan_status("scan-1")
+    
+    scan = asyncio.run(run())
+    
+    assert len(mongodb.bulk_writes) == 1
+    assert len(mongodb.bulk_writes[0]) == 1
+    assert scan['status'] == 'completed'
+    assert scan['message'] == 'Done'
+    assert scan['graph_id'] == 'graph-1'
+
+
+def test_full_batch_flushes_without_waiting(mongodb):
+    """Reaching the batch size writes at once instead of after the flush delay"""
+    mongodb.scan_batch_size = 2
+    mongodb.scan_flush_delay = 60
+    
+    async def run():
+        await asyncio.wait_for(asyncio.gather(
+            mongodb.update_scan_status("scan-1", "scanning", "Cloning"),
+            mongodb.update_scan_status("scan-2", "scanning", "Cloning")
+        ), 1)
+    
+    asyncio.run(run())
+    
+    assert [len(items) for items in mongodb.bulk_writes] == [2]
+
+
+def test_failed_bulk_write_raises_in_every_caller(mongodb):
+    """Every update waiting on a failed bulk write sees its error"""
+    async def failing_bulk_upsert(items):
+        raise ConnectionError("MongoDB unreachable")
+    
+    mongodb.bulk_upsert_scans = failing_bulk_upsert
+    
+    async def run():
+        return await asyncio.gather(
+            mongodb.update_scan_status("scan-1", "scanning", "Cloning"),
+            mongodb.update_scan_status("scan-2", "scanning", "Cloning"),
+            return_exceptions=True
+        )
+    
+    results = asyncio.run(run())
+    
+    assert all(isinstance(result, ConnectionError) for result in results)
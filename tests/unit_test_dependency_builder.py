@@ -3,7 +3,11 @@ Unit Tests for Dependency Builder
 """
 import pytest
 import networkx as nx
-from services.repository_scanner.src.scanner.dependency_builder import DependencyGraphBuilder
+from services.repository_scanner.src.scanner.dependency_builder import (
+    DependencyGraphBuilder,
+    _brandes_centralities,
+    _igraph_centralities
+)
 
 
 @pytest.fixture
@@ -94,8 +98,10 @@ def test_get_node_impact(builder, sample_ast_trees):
     impact = builder.get_node_impact('file_a.py', graph)
     
     assert 'node_id' in impact
-    assert 'descendants' in impact
-    assert 'ancestors' in impact
+    assert 'descendants_count' in impact
+    assert 'ancestors_count' in impact
+    assert 'top_descendants' in impact
+    assert 'top_ancestors' in impact
     assert 'in_degree' in impact
     assert 'out_degree' in impact
     assert 'centrality_metrics' in impact
@@ -110,6 +116,75 @@ def test_get_node_impact_nonexistent(builder, sample_ast_trees):
     assert 'error' in impact
 
 
+def _random_digraph(seed):
+    """Random digraph with cycles and self-loops"""
+    graph = nx.gnp_random_graph(40, 0.06, seed=seed, directed=True)
+    graph.add_edges_from((node, node) for node in range(0, 40, 7))
+    return graph
+
+
+def _assert_counts_match(builder, graph):
+    """Node impact counts equal the sizes of nx.descendants and nx.ancestors"""
+    for node in graph:
+        impact = builder.get_node_impact(node, graph)
+        assert impact['descendants_count'] == len(nx.descendants(graph, node))
+        assert impact['ancestors_count'] == len(nx.ancestors(graph, node))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("frozen", [False, True], ids=['mutable', 'frozen'])
+@pytest.mark.parametrize("max_nodes", [20000, 0], ids=['bitsets', 'memo'])
+def test_get_node_impact_counts(builder, seed, frozen, max_nodes):
+    """Reachability counts match NetworkX with and without the precomputed cache"""
+    builder.reachability_cache_max_nodes = max_nodes
+    graph = _random_digraph(seed)
+    if frozen:
+        graph = nx.freeze(graph)
+    
+    # Query twice so the second pass is answered from the cache
+    _assert_counts_match(builder, graph)
+    _assert_counts_match(builder, graph)
+
+
+def test_get_node_impact_counts_after_mutation(builder):
+    """Counts follow a graph mutated without changing its node or edge count"""
+    graph = nx.DiGraph([(0, 1), (1, 2), (3, 4)])
+    _assert_counts_match(builder, graph)
+    
+    graph.remove_edge(1, 2)
+    graph.add_edge(2, 3)
+    _assert_counts_match(builder, graph)
+    assert builder.get_node_impact(2, graph)['descendants_count'] == 2
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("backend,workers", [
+    ('igraph', None),
+    ('compiled', 1),
+    ('compiled', 2),
+    ('python', 1),
+    ('python', 2),
+], ids=['igraph', 'compiled', 'compiled_parallel', 'python', 'python_processes'])
+def test_centrality_backends_match_networkx(monkeypatch, backend, workers, seed):
+    """Every centrality backend matches the normalized NetworkX functions"""
+    graph = _random_digraph(seed)
+    
+    if backend == 'igraph':
+        pytest.importorskip("igraph")
+        betweenness, closeness, degree = _igraph_centralities(graph)
+    else:
+        if backend == 'compiled':
+            pytest.importorskip("numba")
+        else:
+            monkeypatch.setattr(f"{DependencyGraphBuilder.__module__}.njit", None)
+        # Small chunks so parallel runs fold several partial ranges
+        betweenness, closeness, degree = _brandes_centralities(graph, workers, chunk_size=7)
+    
+    assert betweenness == pytest.approx(nx.betweenness_centrality(graph))
+    assert closeness == pytest.approx(nx.closeness_centrality(graph))
+    assert degree == pytest.approx(nx.degree_centrality(graph))
+
+
 def test_count_node_types(builder, sample_ast_trees):
     """Test node type counting"""
     graph = builder.build_graph(sample_ast_trees)
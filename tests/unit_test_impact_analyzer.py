@@ -1,20 +1,28 @@
 """
 Unit Tests for Impact Analyzer
 """
+import re
+import copy
 import pytest
 import networkx as nx
-from services.impact_analyzer.src.main import ImpactAnalyzer
+from services.impact_analyzer.src.main import ImpactAnalyzer, _warm_worker
 
 
-@pytest.fixture
+@pytest.fixture(scope="module", autouse=True)
+def numba_warmup():
+    """Run the Numba scoring kernel once before the first test that scores nodes"""
+    _warm_worker()
+
+
+@pytest.fixture(scope="module")
 def analyzer():
-    """Create analyzer instance"""
+    """Create analyzer instance, shared by the module's tests"""
     return ImpactAnalyzer()
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_graph():
-    """Create a sample graph for testing"""
+    """Create a sample graph for testing; tests that modify it undo their changes"""
     graph = nx.DiGraph()
     
     # Add nodes
@@ -35,12 +43,17 @@ def sample_graph():
     return graph
 
 
-def test_analyze_impact_single_file(analyzer, sample_graph):
+@pytest.fixture(scope="module")
+def sample_graph_data(sample_graph):
+    """Node-link data of the sample graph, for the JSON path of analyze_impact"""
+    return nx.node_link_data(sample_graph)
+
+
+def test_analyze_impact_single_file(analyzer, sample_graph_data):
     """Test impact analysis for single file change"""
     changed_files = ['file_a']
-    graph_data = nx.node_link_data(sample_graph)
     
-    result = analyzer.analyze_impact(changed_files, graph_data)
+    result = analyzer.analyze_impact(changed_files, sample_graph_data)
     
     assert result['changed_files'] == changed_files
     assert 'impacted_components' in result
@@ -51,13 +64,12 @@ def test_analyze_impact_single_file(analyzer, sample_graph):
 def test_analyze_impact_finds_downstream(analyzer, sample_graph):
     """Test that analysis finds downstream dependencies"""
     changed_files = ['file_a']
-    graph_data = nx.node_link_data(sample_graph)
     
-    result = analyzer.analyze_impact(changed_files, graph_data)
+    result = analyzer.analyze_impact(changed_files, sample_graph)
     
     # file_a -> file_b -> file_c
     # file_a -> service_x -> api_y -> cache_z
-    impacted = set(result['impacted_components'])
+    impacted = result['impacted_set']
     
     # Should include downstream nodes
     assert 'file_b' in impacted
@@ -69,13 +81,31 @@ def test_analyze_impact_finds_downstream(analyzer, sample_graph):
 def test_analyze_impact_multiple_files(analyzer, sample_graph):
     """Test impact analysis with multiple changed files"""
     changed_files = ['file_a', 'file_c']
-    graph_data = nx.node_link_data(sample_graph)
     
-    result = analyzer.analyze_impact(changed_files, graph_data)
+    result = analyzer.analyze_impact(changed_files, sample_graph)
     
     assert len(result['impacted_components']) > len(changed_files)
 
 
+def test_analyze_impact_memo_isolated_from_callers(analyzer, sample_graph_data):
+    """Mutating a returned result does not change a repeated analysis"""
+    changed_files = ['file_b']
+    
+    first = analyzer.analyze_impact(changed_files, sample_graph_data)
+    expected = copy.deepcopy(first)
+    
+    for result in (first, analyzer.analyze_impact(list(changed_files), sample_graph_data)):
+        result['changed_files'].append('file_x')
+        result['impacted_components'].clear()
+        result['criticality_scores']['file_x'] = 1.0
+        result['recommendations'].append('mutated')
+        result['affected_services'].append('mutated')
+    changed_files.append('file_y')
+    
+    again = analyzer.analyze_impact(['file_b'], sample_graph_data)
+    assert again == expected
+
+
 def test_calculate_criticality(analyzer, sample_graph):
     """Test criticality calculation"""
     node = 'cache_z'  # Highly referenced node
@@ -87,17 +117,20 @@ def test_calculate_criticality(analyzer, sample_graph):
 
 def test_calculate_criticality_hub_node(analyzer, sample_graph):
     """Test criticality of hub nodes (high degree)"""
-    # Create a hub node with many connections
-    hub_graph = sample_graph.copy()
+    # Add a hub node to the shared graph for this test only
     hub_node = 'hub'
-    hub_graph.add_node(hub_node)
-    
-    # Connect many nodes to hub
-    for node in ['file_a', 'file_b', 'file_c', 'service_x']:
-        hub_graph.add_edge(node, hub_node)
-    
-    hub_score = analyzer.calculate_criticality(hub_node, hub_graph)
-    peripheral_score = analyzer.calculate_criticality('file_a', hub_graph)
+    sample_graph.add_node(hub_node)
+    
+    try:
+        # Connect many nodes to hub
+        for node in ['file_a', 'file_b', 'file_c', 'service_x']:
+            sample_graph.add_edge(node, hub_node)
+        
+        hub_score = analyzer.calculate_criticality(hub_node, sample_graph)
+        peripheral_score = analyzer.calculate_criticality('file_a', sample_graph)
+    finally:
+        # Removing the node removes its edges too
+        sample_graph.remove_node(hub_node)
     
     # Hub should have higher criticality
     assert hub_score >= peripheral_score
@@ -106,9 +139,8 @@ def test_calculate_criticality_hub_node(analyzer, sample_graph):
 def test_risk_level_low(analyzer, sample_graph):
     """Test risk level calculation for low impact"""
     changed_files = ['cache_z']  # Leaf node with no outgoing edges
-    graph_data = nx.node_link_data(sample_graph)
     
-    result = analyzer.analyze_impact(changed_files, graph_data)
+    result = analyzer.analyze_impact(changed_files, sample_graph)
     
     assert result['risk_level'] == 'LOW'
 
@@ -129,51 +161,20 @@ def test_extract_services(analyzer):
     assert 'utils' not in services  # Not in services/
 
 
-def test_recommendations_critical_risk(analyzer):
-    """Test recommendations for critical risk"""
+@pytest.mark.parametrize("risk_level,impacted_count,high_risk_count,changed_files,expected", [
+    ('CRITICAL', 50, 10, ['src/api/core.py'], re.compile(r'URGENT|Extensive', re.IGNORECASE)),
+    ('HIGH', 20, 5, ['src/database/schema.py'], re.compile(r'High impact|comprehensive', re.IGNORECASE)),
+    ('MEDIUM', 5, 0, ['src/database/migrations.py'], re.compile(r'Database|migration', re.IGNORECASE)),
+    ('HIGH', 10, 3, ['src/auth/security.py'], re.compile(r'security', re.IGNORECASE)),
+], ids=['critical_risk', 'high_risk', 'database_changes', 'security_changes'])
+def test_recommendations(analyzer, risk_level, impacted_count, high_risk_count, changed_files, expected):
+    """Test recommendations by risk level and changed file type"""
     recs = analyzer._generate_recommendations(
-        'CRITICAL',
-        impacted_count=50,
-        high_risk_count=10,
-        changed_files=['src/api/core.py']
+        risk_level,
+        impacted_count=impacted_count,
+        high_risk_count=high_risk_count,
+        changed_files=changed_files
     )
     
     assert len(recs) > 0
-    assert any('URGENT' in rec or 'Extensive' in rec for rec in recs)
-
-
-def test_recommendations_high_risk(analyzer):
-    """Test recommendations for high risk"""
-    recs = analyzer._generate_recommendations(
-        'HIGH',
-        impacted_count=20,
-        high_risk_count=5,
-        changed_files=['src/database/schema.py']
-    )
-    
-    assert len(recs) > 0
-    assert any('High impact' in rec or 'comprehensive' in rec for rec in recs)
-
-
-def test_recommendations_database_changes(analyzer):
-    """Test recommendations for database changes"""
-    recs = analyzer._generate_recommendations(
-        'MEDIUM',
-        impacted_count=5,
-        high_risk_count=0,
-        changed_files=['src/database/migrations.py']
-    )
-    
-    assert any('Database' in rec or 'migration' in rec for rec in recs)
-
-
-def test_recommendations_security_changes(analyzer):
-    """Test recommendations for security changes"""
-    recs = analyzer._generate_recommendations(
-        'HIGH',
-        impacted_count=10,
-        high_risk_count=3,
-        changed_files=['src/auth/security.py']
-    )
-    
-    assert any('security' in rec.lower() for rec in recs)
+    assert any(expected.search(rec) for rec in recs)
@@ -0,0 +1,165 @@
+"""
+Unit Tests for API Gateway - Security
+"""
+import random
+import pytest
+from services.api_gateway.security import PromptSecurityValidator, RedisRateLimiter
+
+
+UNICODE_EVASIONS = [
+    'union\u00a0select * from users',   # no-break space
+    'union\u3000select * from users',   # ideographic space
+    'run \u017fubprocess now',          # long s folds to s
+    'onclic\u212a=alert(1)',            # Kelvin sign folds to k
+    '; \u2003drop table users',         # em space
+]
+
+ASCII_INPUTS = [
+    'union select * from users',
+    'UNION\tSELECT',
+    'union\x1fselect',
+    ';\x1cdrop table users',
+    "' or 'a'='a",
+    'please eval this',
+    'evaluate this',
+    'Ignore Previous Instructions',
+    'os.system("ls")',
+    'a perfectly normal question about caching',
+    'insert\x0binto',
+]
+
+
+def _re_verdict(text):
+    """Which check the re patterns fail, or None"""
+    if PromptSecurityValidator._BLOCKED_RE.search(text):
+        return 'blocked'
+    if PromptSecurityValidator._SQL_INJECTION_RE.search(text):
+        return 'sql'
+    return None
+
+
+def _hyperscan_verdict(text):
+    """Which check the Hyperscan database fails, or None"""
+    matched = PromptSecurityValidator._scan_input(text)
+    if not matched:
+        return None
+    return 'blocked' if min(matched) < len(PromptSecurityValidator.BLOCKED_PATTERNS) else 'sql'
+
+
+@pytest.fixture
+def hyperscan_db():
+    """Skip unless the Hyperscan database compiled"""
+    if PromptSecurityValidator._INPUT_SCAN_DB is None:
+        pytest.skip("hyperscan not installed")
+
+
+@pytest.mark.parametrize("text", UNICODE_EVASIONS)
+def test_sanitize_blocks_unicode_evasions(text):
+    """Unicode whitespace and case folding are caught whether or not Hyperscan is installed"""
+    assert _re_verdict(text) is not None
+    with pytest.raises(ValueError):
+        PromptSecurityValidator.sanitize_input(text)
+
+
+@pytest.mark.parametrize("text", ASCII_INPUTS)
+def test_hyperscan_matches_re_on_ascii(hyperscan_db, text):
+    """Hyperscan and re give the same verdict on ASCII input"""
+    assert _hyperscan_verdict(text) == _re_verdict(text)
+
+
+def test_hyperscan_matches_re_on_random_ascii(hyperscan_db):
+    """Hyperscan and re agree on random mixes of pattern fragments and ASCII noise"""
+    fragments = ['union', 'select', 'drop', ';', "'", '"', 'or', '=', 'eval', 'exec',
+                 'system(', 'os.', 'subprocess', 'x', '_', ' ', '\t', '\x1c', '\x1f', '\x0b']
+    rnd = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rnd.choice(fragments) for _ in range(rnd.randint(1, 8)))
+        assert _hyperscan_verdict(text) == _re_verdict(text), repr(text)
+
+
+@pytest.mark.parametrize("text", ASCII_INPUTS + UNICODE_EVASIONS)
+def test_sanitize_input_follows_re(text):
+    """sanitize_input rejects exactly the inputs the re patterns flag"""
+    if _re_verdict(text) is None:
+        assert PromptSecurityValidator.sanitize_input(text) == text.strip()
+    else:
+        with pytest.raises(ValueError):
+            PromptSecurityValidator.sanitize_input(text)
+
+
+class FakeRedis:
+    """In-memory stand-in for the limiter's Redis client, running CHECK_SCRIPT in Python"""
+    
+    def __init__(self, redis_module):
+        self.redis_module = redis_module
+        self.counters = {}
+        self.down = False
+    
+    def _check_up(self):
+        if self.down:
+            raise self.redis_module.ConnectionError("Redis is down")
+    
+    def register_script(self, script):
+        def check(keys, args):
+            self._check_up()
+            minute, hour = (self.counters.get(key, 0) for key in keys)
+            if minute >= args[0] or hour >= args[1]:
+                return [minute, hour, 0]
+            for key in keys:
+                self.counters[key] = self.counters.get(key, 0) + 1
+            return [self.counters[keys[0]], self.counters[keys[1]], 1]
+        return check
+    
+    def mget(self, keys):
+        self._check_up()
+        return [self.counters.get(key) for key in keys]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Make RedisRateLimiter connect to a FakeRedis"""
+    redis = pytest.importorskip("redis")
+    client = FakeRedis(redis)
+    monkeypatch.setattr(redis.Redis, "from_url", lambda url, **kwargs: client)
+    return client
+
+
+def test_redis_rate_limiter_allows_within_limits(fake_redis):
+    """Requests within the limits are allowed and counted"""
+    limiter = RedisRateLimiter("redis://test", requests_per_minute=3, requests_per_hour=10)
+    
+    assert limiter.check_rate_limit("1.2.3.4")
+    assert limiter.check_rate_limit("1.2.3.4")
+    assert limiter.get_remaining_requests("1.2.3.4") == {
+        "remaining_per_minute": 1,
+        "remaining_per_hour": 8
+    }
+
+
+@pytest.mark.parametrize("per_minute,per_hour", [(2, 10), (10, 2)], ids=['minute', 'hour'])
+def test_redis_rate_limiter_rejects_without_counting(fake_redis, per_minute, per_hour):
+    """Requests over either limit are rejected and do not use up the other"""
+    limiter = RedisRateLimiter("redis://test", requests_per_minute=per_minute, requests_per_hour=per_hour)
+    
+    assert limiter.check_rate_limit("1.2.3.4")
+    assert limiter.check_rate_limit("1.2.3.4")
+    assert not limiter.check_rate_limit("1.2.3.4")
+    assert not limiter.check_rate_limit("1.2.3.4")
+    assert fake_redis.counters == {"rl:1.2.3.4:m": 2, "rl:1.2.3.4:h": 2}
+    # Other clients have their own counters
+    assert limiter.check_rate_limit("5.6.7.8")
+
+
+def test_redis_rate_limiter_falls_back_to_local(fake_redis):
+    """Without Redis the in-process limiter enforces the same limits"""
+    limiter = RedisRateLimiter("redis://test", requests_per_minute=2, requests_per_hour=10)
+    fake_redis.down = True
+    
+    assert limiter.check_rate_limit("1.2.3.4")
+    assert limiter.check_rate_limit("1.2.3.4")
+    assert not limiter.check_rate_limit("1.2.3.4")
+    assert limiter.get_remaining_requests("1.2.3.4") == {
+        "remaining_per_minute": 0,
+        "remaining_per_hour": 8
+    }
+    assert fake_redis.counters == {}